@@ -1,7 +1,14 @@
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cateringproject.settings")
 
+# ASGI, so streaming responses (order events) are sent as they are produced
 application = get_asgi_application()
+
+if settings.DEBUG:
+    # Static files of the admin, served by `runserver` under WSGI
+    application = ASGIStaticFilesHandler(application)
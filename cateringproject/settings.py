@@ -168,11 +168,37 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Connection pool used by `shared.cache.CacheService`
+CACHE_REDIS_URL = os.getenv("DJANGO_CACHE_URL", default="redis://localhost:6379/0")
+CACHE_REDIS_MAX_CONNECTIONS = int(os.getenv("DJANGO_CACHE_MAX_CONNECTIONS", default="50"))
+CACHE_REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("DJANGO_CACHE_HEALTH_CHECK_INTERVAL", default="30"))
+CACHE_REDIS_SOCKET_TIMEOUT = float(os.getenv("DJANGO_CACHE_SOCKET_TIMEOUT", default="5"))
+# Seconds a stream reader waits on XREAD, kept below the socket timeout
+CACHE_STREAM_READ_BLOCK = float(os.getenv("DJANGO_CACHE_STREAM_READ_BLOCK", default="1"))
+# In-process (L1) cache in front of Redis, invalidated across processes through pub/sub
+CACHE_LOCAL_NAMESPACES: dict[str, dict[str, int]] = {
+    "recommendations": {"ttl": 60, "max_size": 10_000},
+}
+# Value encoding per namespace, see `shared.codecs`. Payloads above `compress_threshold` bytes are zlib-compressed
+CACHE_DEFAULT_CODEC = {"codec": "json", "compress_threshold": None}
+CACHE_NAMESPACE_CODECS: dict[str, dict] = {
+    "orders": {"codec": "orjson", "compress_threshold": None},
+    "recommendations": {"codec": "orjson", "compress_threshold": 512},
+    "menu": {"codec": "orjson", "compress_threshold": 1024},
+}
+# Seconds a rendered menu is kept. Entries are keyed by the menu version, so changes never serve stale menus
+MENU_CACHE_TTL = int(os.getenv("DJANGO_MENU_CACHE_TTL", default="3600"))
+
+# Seconds a process trusts its copy of the restaurants and dishes before checking the Redis version stamp
+REFERENCE_DATA_CHECK_INTERVAL = float(os.getenv("DJANGO_REFERENCE_DATA_CHECK_INTERVAL", default="5"))
+
+# Where counters and histograms go, see `shared.metrics`. Use `shared.metrics.NullMetrics` to turn them off
+METRICS_SINK = os.getenv("DJANGO_METRICS_SINK", default="shared.metrics.InMemoryMetrics")
+
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
-        # "LOCATION": os.getenv("DJANGO_CACHE_URL", default="redis://localhost:6379/0"),
-        "LOCATION": "redis://localhost:6379/0",
+        "LOCATION": CACHE_REDIS_URL,
         "TIMEOUT": 50,
     }
 }
@@ -214,6 +240,69 @@ CELERY_TASK_QUEUES = {
     "low_priority": {"exchange": "low_priority", "routing_key": "low_priority"},
 }
 
+# ==============================
+# ORDER TRACKING SECTION
+# ==============================
+# Max number of orders in one `POST /food/orders/bulk/` request
+ORDERS_BULK_MAX_SIZE = int(os.getenv("DJANGO_ORDERS_BULK_MAX_SIZE", default="100"))
+# Seconds between two `poll_provider_orders` runs of Celery beat
+ORDER_POLL_INTERVAL = float(os.getenv("DJANGO_ORDER_POLL_INTERVAL", default="1"))
+# Max number of simultaneous HTTP requests to one provider while polling
+ORDER_POLL_CONCURRENCY = int(os.getenv("DJANGO_ORDER_POLL_CONCURRENCY", default="10"))
+# The poller lock is dropped after this number of seconds if the worker died while holding it
+ORDER_POLL_LOCK_TTL = int(os.getenv("DJANGO_ORDER_POLL_LOCK_TTL", default="60"))
+# Placing an order in an unavailable restaurant (or Uklon) is retried this number of times, every DELAY seconds
+ORDER_PLACEMENT_RETRIES = int(os.getenv("DJANGO_ORDER_PLACEMENT_RETRIES", default="10"))
+ORDER_PLACEMENT_RETRY_DELAY = int(os.getenv("DJANGO_ORDER_PLACEMENT_RETRY_DELAY", default="30"))
+# Orders that are not cooked within this number of seconds are marked as FAILED
+ORDER_COOKING_TIMEOUT = int(os.getenv("DJANGO_ORDER_COOKING_TIMEOUT", default="3600"))
+# Delivery tracking polls every MIN seconds while the courier moves and backs off up to MAX seconds while idle
+DELIVERY_POLL_MIN_INTERVAL = float(os.getenv("DJANGO_DELIVERY_POLL_MIN_INTERVAL", default="1"))
+DELIVERY_POLL_MAX_INTERVAL = float(os.getenv("DJANGO_DELIVERY_POLL_MAX_INTERVAL", default="15"))
+DELIVERY_POLL_BACKOFF = float(os.getenv("DJANGO_DELIVERY_POLL_BACKOFF", default="2"))
+# Deliveries that are not finished within this number of seconds are marked as NOT_DELIVERED
+DELIVERY_TIMEOUT = int(os.getenv("DJANGO_DELIVERY_TIMEOUT", default="7200"))
+# Seconds of silence after which the order events stream sends a heartbeat comment
+ORDER_EVENTS_HEARTBEAT = float(os.getenv("DJANGO_ORDER_EVENTS_HEARTBEAT", default="15"))
+# Seconds an order events stream token can be used to (re)connect
+ORDER_EVENTS_TOKEN_TTL = int(os.getenv("DJANGO_ORDER_EVENTS_TOKEN_TTL", default="300"))
+# Seconds between two `drain_webhook_events` runs of Celery beat and the number of events applied at once
+WEBHOOK_DRAIN_INTERVAL = float(os.getenv("DJANGO_WEBHOOK_DRAIN_INTERVAL", default="1"))
+WEBHOOK_BATCH_SIZE = int(os.getenv("DJANGO_WEBHOOK_BATCH_SIZE", default="500"))
+# The drainer lock is dropped after this number of seconds if the worker died while holding it
+WEBHOOK_LOCK_TTL = int(os.getenv("DJANGO_WEBHOOK_LOCK_TTL", default="60"))
+# The webhook events stream is capped (approximately) at this number of entries
+WEBHOOK_EVENTS_MAXLEN = int(os.getenv("DJANGO_WEBHOOK_EVENTS_MAXLEN", default="100000"))
+
+# ==============================
+# PROVIDERS SECTION
+# ==============================
+# Restaurant name (case-insensitive) -> provider integration, see `food.registry`.
+# `tracking` is "webhook" when the provider pushes status changes or "poll" for `poll_provider_orders`
+RESTAURANT_PROVIDERS = {
+    "kfc": {"client": "food.providers.kfc.Client", "tracking": "webhook", "queue": "high_priority"},
+    "silpo": {"client": "food.providers.silpo.Client", "tracking": "poll", "queue": "high_priority"},
+}
+
+# Keep-alive `httpx.Client` of every provider, see `food.providers.http`. Timeouts are in seconds
+PROVIDER_HTTP_CONNECT_TIMEOUT = float(os.getenv("DJANGO_PROVIDER_HTTP_CONNECT_TIMEOUT", default="2"))
+PROVIDER_HTTP_READ_TIMEOUT = float(os.getenv("DJANGO_PROVIDER_HTTP_READ_TIMEOUT", default="10"))
+PROVIDER_HTTP_WRITE_TIMEOUT = float(os.getenv("DJANGO_PROVIDER_HTTP_WRITE_TIMEOUT", default="10"))
+PROVIDER_HTTP_POOL_TIMEOUT = float(os.getenv("DJANGO_PROVIDER_HTTP_POOL_TIMEOUT", default="5"))
+PROVIDER_HTTP_MAX_CONNECTIONS = int(os.getenv("DJANGO_PROVIDER_HTTP_MAX_CONNECTIONS", default="20"))
+PROVIDER_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("DJANGO_PROVIDER_HTTP_MAX_KEEPALIVE_CONNECTIONS", default="10"))
+PROVIDER_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("DJANGO_PROVIDER_HTTP_KEEPALIVE_EXPIRY", default="30"))
+# Every provider call may take up to DEADLINE seconds, retries included.
+# Retries wait a random time up to BACKOFF * 2 ** attempt, capped by MAX_BACKOFF seconds
+PROVIDER_CALL_DEADLINE = float(os.getenv("DJANGO_PROVIDER_CALL_DEADLINE", default="15"))
+PROVIDER_RETRY_ATTEMPTS = int(os.getenv("DJANGO_PROVIDER_RETRY_ATTEMPTS", default="3"))
+PROVIDER_RETRY_BACKOFF = float(os.getenv("DJANGO_PROVIDER_RETRY_BACKOFF", default="0.2"))
+PROVIDER_RETRY_MAX_BACKOFF = float(os.getenv("DJANGO_PROVIDER_RETRY_MAX_BACKOFF", default="2"))
+# The circuit breaker opens after THRESHOLD failures within WINDOW seconds and stays open for COOLDOWN seconds
+PROVIDER_BREAKER_THRESHOLD = int(os.getenv("DJANGO_PROVIDER_BREAKER_THRESHOLD", default="5"))
+PROVIDER_BREAKER_WINDOW = int(os.getenv("DJANGO_PROVIDER_BREAKER_WINDOW", default="30"))
+PROVIDER_BREAKER_COOLDOWN = int(os.getenv("DJANGO_PROVIDER_BREAKER_COOLDOWN", default="30"))
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Catering API",
     "DESCRIPTION": "Catering API",
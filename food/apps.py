@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FoodConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "food"
+
+    def ready(self):
+        # Connects the reference data invalidation signals
+        from . import reference  # noqa: F401
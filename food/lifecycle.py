@@ -0,0 +1,84 @@
+"""Order state machine.
+
+Every status change is one conditional UPDATE (`WHERE status IN allowed_from`),
+so concurrent workers, webhooks and pollers cannot move an order backwards,
+and duplicates are rejected by the database without reading the row first.
+"""
+
+from collections.abc import Iterable
+
+from .enums import OrderStatus
+from .models import Order
+
+CANCELLED = {
+    OrderStatus.CANCELLED_BY_CUSTOMER,
+    OrderStatus.CANCELLED_BY_MANAGER,
+    OrderStatus.CANCELLED_BY_ADMIN,
+    OrderStatus.CANCELLED_BY_RESTAURANT,
+}
+
+# status -> statuses it can move to. Missing statuses are final.
+TRANSITIONS: dict[OrderStatus, set[OrderStatus]] = {
+    OrderStatus.NOT_STARTED: {
+        OrderStatus.COOKING,
+        OrderStatus.COOKED,
+        OrderStatus.COOKING_REJECTED,
+        OrderStatus.FAILED,
+        *CANCELLED,
+    },
+    OrderStatus.COOKING: {
+        OrderStatus.COOKED,
+        OrderStatus.COOKING_REJECTED,
+        OrderStatus.FAILED,
+        *(CANCELLED - {OrderStatus.CANCELLED_BY_CUSTOMER}),
+    },
+    OrderStatus.COOKED: {
+        OrderStatus.DELIVERY_LOOKUP,
+        OrderStatus.FAILED,
+        OrderStatus.CANCELLED_BY_ADMIN,
+    },
+    OrderStatus.DELIVERY_LOOKUP: {
+        OrderStatus.DELIVERY,
+        OrderStatus.NOT_DELIVERED,
+        OrderStatus.FAILED,
+        OrderStatus.CANCELLED_BY_ADMIN,
+    },
+    OrderStatus.DELIVERY: {
+        OrderStatus.DELIVERED,
+        OrderStatus.NOT_DELIVERED,
+        OrderStatus.CANCELLED_BY_DRIVER,
+        OrderStatus.CANCELLED_BY_ADMIN,
+    },
+}
+
+FINAL_STATUSES = frozenset(status for status in OrderStatus if status not in TRANSITIONS)
+
+# status -> statuses it can be reached from
+ALLOWED_FROM: dict[OrderStatus, set[OrderStatus]] = {
+    status: {source for source, targets in TRANSITIONS.items() if status in targets} for status in OrderStatus
+}
+
+
+def can_transition(source: OrderStatus, target: OrderStatus) -> bool:
+    return target in TRANSITIONS.get(source, set())
+
+
+def transition_many(order_ids: Iterable[int], target: OrderStatus) -> int:
+    """Move every order that is allowed to reach `target`. Returns the number of updated orders."""
+
+    order_ids = list(order_ids)
+    if not order_ids or not ALLOWED_FROM[target]:
+        return 0
+
+    updated = Order.objects.filter(id__in=order_ids, status__in=ALLOWED_FROM[target]).update(status=target)
+
+    if updated != len(order_ids):
+        print(f"Rejected {len(order_ids) - updated} of {len(order_ids)} transitions to {target}")
+
+    return updated
+
+
+def transition(order_id: int, target: OrderStatus) -> bool:
+    """Move the order to `target`. `False` means the transition was invalid or has already happened."""
+
+    return transition_many([order_id], target) == 1
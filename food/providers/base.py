@@ -0,0 +1,81 @@
+from dataclasses import asdict
+from typing import Any, ClassVar
+
+import httpx
+
+from . import resilience
+from .http import get_async_http_client, get_http_client
+
+
+class ProviderClient:
+    """HTTP client of a provider API with `POST <BASE_URL>` and `GET <BASE_URL>/<id>` order endpoints.
+
+    Provider modules only declare their DTOs, e.g.
+
+        class Client(ProviderClient):
+            name = "kfc"
+            BASE_URL = os.getenv("KFC_BASE_URL", "http://kfc-mock:8002/api/orders")
+            response_class = OrderResponse
+
+    Every call has a sync and an asyncio (`a`-prefixed) flavour and goes through
+    `food.providers.resilience` (retries, deadline, circuit breaker).
+    """
+
+    name: ClassVar[str]
+    BASE_URL: ClassVar[str]
+    response_class: ClassVar[type]
+
+    @classmethod
+    def _request(cls, operation: str, method: str, url: str, idempotent: bool = True, **kwargs) -> Any:
+        client = get_http_client(cls.name)
+
+        def send(deadline: float) -> httpx.Response:
+            return client.request(method, url, timeout=resilience.attempt_timeout(client, deadline), **kwargs)
+
+        return cls.response_class(**resilience.call(cls.name, operation, send, idempotent).json())
+
+    @classmethod
+    async def _arequest(cls, operation: str, method: str, url: str, idempotent: bool = True, **kwargs) -> Any:
+        client = get_async_http_client(cls.name)
+
+        async def send(deadline: float) -> httpx.Response:
+            return await client.request(method, url, timeout=resilience.attempt_timeout(client, deadline), **kwargs)
+
+        return cls.response_class(**(await resilience.acall(cls.name, operation, send, idempotent)).json())
+
+    @classmethod
+    def create_order(cls, order: Any) -> Any:
+        return cls._request("create_order", "POST", cls.BASE_URL, idempotent=False, json=asdict(order))
+
+    @classmethod
+    def get_order(cls, order_id: str) -> Any:
+        return cls._request("get_order", "GET", f"{cls.BASE_URL}/{order_id}")
+
+    @classmethod
+    async def acreate_order(cls, order: Any) -> Any:
+        return await cls._arequest("create_order", "POST", cls.BASE_URL, idempotent=False, json=asdict(order))
+
+    @classmethod
+    async def aget_order(cls, order_id: str) -> Any:
+        return await cls._arequest("get_order", "GET", f"{cls.BASE_URL}/{order_id}")
+
+
+class RestaurantProviderClient(ProviderClient):
+    """Client of a restaurant, which cooks the dishes of our orders.
+
+    The order body is built from `request_class` holding a list of `item_class`, e.g.
+
+        request_class = OrderRequestBody
+        item_class = OrderItem
+    """
+
+    request_class: ClassVar[type]
+    item_class: ClassVar[type]
+
+    @classmethod
+    def order_request(cls, items: list[dict]) -> Any:
+        """The `create_order` body for order items with `dish__name` and `quantity`."""
+
+        return cls.request_class(
+            order=[cls.item_class(dish=item["dish__name"], quantity=item["quantity"]) for item in items]
+        )
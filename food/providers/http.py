@@ -0,0 +1,68 @@
+import threading
+
+import httpx
+from django.conf import settings
+
+from shared.process import LoopLocal, ProcessLocal
+
+_clients: ProcessLocal[dict[str, httpx.Client]] = ProcessLocal(dict)
+_lock = ProcessLocal(threading.Lock)
+_async_clients: LoopLocal[dict[str, httpx.AsyncClient]] = LoopLocal(dict)
+
+
+def _client_options() -> dict:
+    return {
+        "timeout": httpx.Timeout(
+            connect=settings.PROVIDER_HTTP_CONNECT_TIMEOUT,
+            read=settings.PROVIDER_HTTP_READ_TIMEOUT,
+            write=settings.PROVIDER_HTTP_WRITE_TIMEOUT,
+            pool=settings.PROVIDER_HTTP_POOL_TIMEOUT,
+        ),
+        "limits": httpx.Limits(
+            max_connections=settings.PROVIDER_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.PROVIDER_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.PROVIDER_HTTP_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def get_http_client(provider: str) -> httpx.Client:
+    """Return the process-wide keep-alive client of the provider."""
+
+    clients = _clients.get()
+
+    with _lock.get():
+        client = clients.get(provider)
+
+        if client is None:
+            client = clients[provider] = httpx.Client(**_client_options())
+
+        return client
+
+
+def get_async_http_client(provider: str) -> httpx.AsyncClient:
+    """asyncio counterpart of `get_http_client`, one client per provider and event loop."""
+
+    clients = _async_clients.get()
+    client = clients.get(provider)
+
+    if client is None:
+        client = clients[provider] = httpx.AsyncClient(**_client_options())
+
+    return client
+
+
+async def close_async_http_clients() -> None:
+    """Close the clients of the running event loop, e.g. before `asyncio.run()` returns."""
+
+    for client in (_async_clients.pop() or {}).values():
+        await client.aclose()
+
+
+def close_http_clients() -> None:
+    """Close the connections of this process. The next `get_http_client` starts fresh."""
+
+    for client in (_clients.peek() or {}).values():
+        client.close()
+
+    _clients.reset()
@@ -1,8 +1,8 @@
 import enum
 import os
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass
 
-import httpx
+from .base import RestaurantProviderClient
 
 
 class OrderStatus(enum.StrEnum):
@@ -29,17 +29,9 @@ class OrderResponse:
     status: OrderStatus
 
 
-class Client:
+class Client(RestaurantProviderClient):
+    name = "kfc"
     BASE_URL = os.getenv("KFC_BASE_URL", "http://kfc-mock:8001/api/orders")
-
-    @classmethod
-    def create_order(cls, order: OrderRequestBody):
-        response: httpx.Response = httpx.post(cls.BASE_URL, json=asdict(order))
-        response.raise_for_status()
-        return OrderResponse(**response.json())
-
-    @classmethod
-    def get_order(cls, order_id: str):
-        response: httpx.Response = httpx.get(f"{cls.BASE_URL}/{order_id}")
-        response.raise_for_status()
-        return OrderResponse(**response.json())
+    response_class = OrderResponse
+    request_class = OrderRequestBody
+    item_class = OrderItem
@@ -0,0 +1,254 @@
+"""Retries, deadline budget and circuit breaker around provider HTTP calls.
+
+Every call gets `PROVIDER_CALL_DEADLINE` seconds in total. Transient errors are
+retried up to `PROVIDER_RETRY_ATTEMPTS` times with full-jitter exponential backoff.
+Non-idempotent calls (creating an order) are retried only when the request
+could not have reached the provider.
+
+The breaker state lives in Redis, so every process sees it: after
+`PROVIDER_BREAKER_THRESHOLD` failures within `PROVIDER_BREAKER_WINDOW` seconds
+calls fail fast with `ProviderUnavailable` for `PROVIDER_BREAKER_COOLDOWN`
+seconds, then a single probe call decides whether the breaker closes again.
+
+Every attempt is recorded in the metrics sink, tagged with the provider and
+the operation: `provider.request_ms`, `provider.responses` (per status code),
+`provider.timeouts`, `provider.errors` and the request/response sizes.
+"""
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+
+import httpx
+from django.conf import settings
+
+from shared.cache import CacheService
+from shared.metrics import MetricsSink, get_metrics
+
+# The request was never sent, so even creating an order is safe to repeat
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class ProviderUnavailable(httpx.HTTPError):
+    """The circuit breaker of the provider is open."""
+
+
+class CircuitBreaker:
+    NAMESPACE = "circuit_breaker"
+
+    def __init__(self, provider: str, cache: CacheService | None = None):
+        self.provider = provider
+        self.cache: CacheService = cache or CacheService()
+        self.probing = False
+
+    def _key(self, name: str) -> tuple[str, str]:
+        return self.NAMESPACE, f"{self.provider}:{name}"
+
+    def state(self) -> str:
+        values = self.cache.get_many([self._key("open"), self._key("tripped")])
+
+        if values[self._key("open")] is not None:
+            return "open"
+        if values[self._key("tripped")] is not None:
+            return "half_open"
+
+        return "closed"
+
+    def allow(self) -> bool:
+        """Whether a call may go through. In the half-open state only one process gets to probe."""
+
+        match self.state():
+            case "closed":
+                return True
+            case "half_open":
+                self.probing = self.cache.add(*self._key("probe"), {}, ttl=settings.PROVIDER_BREAKER_COOLDOWN)
+                return self.probing
+            case _:
+                return False
+
+    def record_success(self) -> None:
+        if self.probing:
+            print(f"{self.provider} circuit breaker is closed")
+            self.cache.delete_many([self._key("tripped"), self._key("probe"), self._key("failures")])
+            self.probing = False
+
+    def record_failure(self) -> None:
+        failures = self.cache.increment(*self._key("failures"), ttl=settings.PROVIDER_BREAKER_WINDOW)
+
+        if self.probing or failures >= settings.PROVIDER_BREAKER_THRESHOLD:
+            self.open()
+
+    def open(self) -> None:
+        print(f"{self.provider} circuit breaker is open")
+        get_metrics().increment("provider.breaker_opened", tags={"provider": self.provider})
+
+        with self.cache.batch():
+            self.cache.set(*self._key("open"), {}, ttl=settings.PROVIDER_BREAKER_COOLDOWN)
+            self.cache.set(*self._key("tripped"), {})
+            self.cache.delete_many([self._key("probe"), self._key("failures")])
+
+        self.probing = False
+
+
+def breaker_states(providers: list[str]) -> dict[str, str]:
+    cache = CacheService()
+
+    return {provider: CircuitBreaker(provider, cache).state() for provider in providers}
+
+
+def is_upstream_failure(error: httpx.HTTPError) -> bool:
+    """Errors that say the provider is unhealthy, as opposed to a bad request of ours."""
+
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500 or error.response.status_code == 429
+
+    return isinstance(error, httpx.TransportError)
+
+
+def was_not_sent(error: httpx.HTTPError) -> bool:
+    """The request never reached the provider: rejected by the breaker or the connection was never made."""
+
+    return isinstance(error, (ProviderUnavailable, *NOT_SENT_ERRORS))
+
+
+def retry_delay(error: httpx.HTTPError, attempt: int, deadline: float, idempotent: bool) -> float | None:
+    """Seconds to wait before the next attempt or `None` if the error must be raised."""
+
+    retryable = isinstance(error, NOT_SENT_ERRORS) or (idempotent and is_upstream_failure(error))
+    if not retryable or attempt + 1 >= settings.PROVIDER_RETRY_ATTEMPTS:
+        return None
+
+    delay = random.uniform(0, min(settings.PROVIDER_RETRY_MAX_BACKOFF, settings.PROVIDER_RETRY_BACKOFF * 2**attempt))
+
+    return delay if time.monotonic() + delay < deadline else None
+
+
+def attempt_timeout(client: httpx.Client | httpx.AsyncClient, deadline: float) -> httpx.Timeout:
+    """Client timeouts cut down to what is left of the call budget."""
+
+    remaining = max(deadline - time.monotonic(), 0.001)
+    timeout = client.timeout
+
+    return httpx.Timeout(
+        connect=min(timeout.connect or remaining, remaining),
+        read=min(timeout.read or remaining, remaining),
+        write=min(timeout.write or remaining, remaining),
+        pool=min(timeout.pool or remaining, remaining),
+    )
+
+
+def record_attempt(
+    metrics: MetricsSink, tags: dict[str, str], started: float, result: httpx.Response | Exception
+) -> None:
+    """Latency, status code and payload sizes of one attempt, or the kind of error it failed with."""
+
+    if not metrics.enabled:
+        return
+
+    metrics.observe("provider.request_ms", (time.perf_counter() - started) * 1000, tags=tags)
+
+    if isinstance(result, httpx.HTTPStatusError):
+        result = result.response
+
+    if isinstance(result, httpx.Response):
+        metrics.increment("provider.responses", tags=tags | {"status": str(result.status_code)})
+        metrics.observe("provider.request_bytes", len(result.request.content), tags=tags)
+        metrics.observe("provider.response_bytes", len(result.content), tags=tags)
+    elif isinstance(result, httpx.TimeoutException):
+        metrics.increment("provider.timeouts", tags=tags | {"error": type(result).__name__})
+    else:
+        metrics.increment("provider.errors", tags=tags | {"error": type(result).__name__})
+
+
+def call(
+    provider: str,
+    operation: str,
+    send: Callable[[float], httpx.Response],
+    idempotent: bool = True,
+) -> httpx.Response:
+    """Run `send(deadline)` with retries and the circuit breaker. Raises the last error when giving up."""
+
+    tags = {"provider": provider, "operation": operation}
+    metrics = get_metrics()
+    breaker = CircuitBreaker(provider)
+
+    if not breaker.allow():
+        metrics.increment("provider.rejected", tags=tags)
+        raise ProviderUnavailable(f"{provider} is unavailable, the circuit breaker is open")
+
+    deadline = time.monotonic() + settings.PROVIDER_CALL_DEADLINE
+    attempt = 0
+
+    while True:
+        started = time.perf_counter()
+
+        try:
+            response = send(deadline)
+            response.raise_for_status()
+        except httpx.HTTPError as error:
+            record_attempt(metrics, tags, started, error)
+            delay = retry_delay(error, attempt, deadline, idempotent)
+
+            if delay is None:
+                if is_upstream_failure(error):
+                    breaker.record_failure()
+                else:
+                    # The provider answered (e.g. a 4xx to a bad request of ours), a probe must not stay taken
+                    breaker.record_success()
+                raise
+
+            print(f"{provider} {operation} failed with {type(error).__name__}, retrying in {delay:.2f}s")
+            metrics.increment("provider.retries", tags=tags)
+            time.sleep(delay)
+            attempt += 1
+        else:
+            record_attempt(metrics, tags, started, response)
+            breaker.record_success()
+            return response
+
+
+async def acall(
+    provider: str,
+    operation: str,
+    send: Callable[[float], Awaitable[httpx.Response]],
+    idempotent: bool = True,
+) -> httpx.Response:
+    """asyncio flavour of `call`. The breaker is checked on a thread, so Redis never blocks the event loop."""
+
+    tags = {"provider": provider, "operation": operation}
+    metrics = get_metrics()
+    breaker = CircuitBreaker(provider)
+
+    if not await asyncio.to_thread(breaker.allow):
+        metrics.increment("provider.rejected", tags=tags)
+        raise ProviderUnavailable(f"{provider} is unavailable, the circuit breaker is open")
+
+    deadline = time.monotonic() + settings.PROVIDER_CALL_DEADLINE
+    attempt = 0
+
+    while True:
+        started = time.perf_counter()
+
+        try:
+            response = await send(deadline)
+            response.raise_for_status()
+        except httpx.HTTPError as error:
+            record_attempt(metrics, tags, started, error)
+            delay = retry_delay(error, attempt, deadline, idempotent)
+
+            if delay is None:
+                if is_upstream_failure(error):
+                    await asyncio.to_thread(breaker.record_failure)
+                else:
+                    await asyncio.to_thread(breaker.record_success)
+                raise
+
+            print(f"{provider} {operation} failed with {type(error).__name__}, retrying in {delay:.2f}s")
+            metrics.increment("provider.retries", tags=tags)
+            await asyncio.sleep(delay)
+            attempt += 1
+        else:
+            record_attempt(metrics, tags, started, response)
+            await asyncio.to_thread(breaker.record_success)
+            return response
@@ -1,8 +1,8 @@
 import enum
 import os
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass
 
-import httpx
+from .base import ProviderClient
 
 
 class OrderStatus(enum.StrEnum):
@@ -30,17 +30,7 @@ class OrderResponse:
         return self.order_id
 
 
-class Client:
+class Client(ProviderClient):
+    name = "uklon"
     BASE_URL = os.getenv("UKLON_BASE_URL", "http://uklon-mock:8003/drivers/orders")
-
-    @classmethod
-    def create_order(cls, order: OrderRequestBody):
-        response: httpx.Response = httpx.post(cls.BASE_URL, json=asdict(order))
-        response.raise_for_status()
-        return OrderResponse(**response.json())
-
-    @classmethod
-    def get_order(cls, order_id: str):
-        response: httpx.Response = httpx.get(f"{cls.BASE_URL}/{order_id}")
-        response.raise_for_status()
-        return OrderResponse(**response.json())
+    response_class = OrderResponse
@@ -0,0 +1,125 @@
+"""Per-process copy of the restaurants and dishes.
+
+Reference data barely changes, so every process loads it with two queries and
+reuses it in requests and tasks. Saving or deleting a `Restaurant` or a `Dish`
+drops the copy of the current process at once and bumps the `reference:version`
+counter in Redis after the commit. Other processes compare their copy with it
+at most every `REFERENCE_DATA_CHECK_INTERVAL` seconds, or at once when an id
+is missing from it (`get_dish`).
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from shared.cache import CacheService
+from shared.process import ProcessLocal
+
+from .models import Dish, Restaurant
+
+NAMESPACE = "reference"
+
+
+@dataclass(frozen=True, slots=True)
+class RestaurantRef:
+    id: int
+    name: str
+    address: str
+
+
+@dataclass(frozen=True, slots=True)
+class DishRef:
+    id: int
+    name: str
+    price: int
+    restaurant_id: int
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    version: int
+    restaurants: dict[int, RestaurantRef]
+    dishes: dict[int, DishRef]
+
+
+@dataclass
+class _ProcessCopy:
+    data: ReferenceData | None = None
+    # `time.monotonic()` of the last version check
+    checked_at: float = 0.0
+
+
+_copy: ProcessLocal[_ProcessCopy] = ProcessLocal(_ProcessCopy)
+_lock = ProcessLocal(threading.Lock)
+
+
+def load_reference_data(version: int) -> ReferenceData:
+    return ReferenceData(
+        version=version,
+        restaurants={
+            restaurant_id: RestaurantRef(restaurant_id, name, address)
+            for restaurant_id, name, address in Restaurant.objects.values_list("id", "name", "address")
+        },
+        dishes={
+            dish_id: DishRef(dish_id, name, price, restaurant_id)
+            for dish_id, name, price, restaurant_id in Dish.objects.values_list("id", "name", "price", "restaurant_id")
+        },
+    )
+
+
+def current_version(cache: CacheService | None = None) -> int:
+    """Version stamp of the restaurants and dishes, bumped after every committed change."""
+
+    return (cache or CacheService()).get(NAMESPACE, "version") or 0
+
+
+def get_reference_data(check: bool = False) -> ReferenceData:
+    """The copy of the current process, compared with the version in Redis if it is due or `check` is set."""
+
+    copy = _copy.get()
+    now = time.monotonic()
+    data = copy.data
+    if data is not None and not check and now - copy.checked_at < settings.REFERENCE_DATA_CHECK_INTERVAL:
+        return data
+
+    with _lock.get():
+        version = current_version()
+
+        if copy.data is None or copy.data.version != version:
+            copy.data = load_reference_data(version)
+
+        copy.checked_at = now
+        return copy.data
+
+
+def get_dish(dish_id: int) -> DishRef | None:
+    dish = get_reference_data().dishes.get(dish_id)
+
+    # The dish could be created in another process since the last version check
+    if dish is None:
+        dish = get_reference_data(check=True).dishes.get(dish_id)
+
+    return dish
+
+
+def reset_reference_data() -> None:
+    _copy.reset()
+
+
+def bump_version() -> None:
+    CacheService().increment(NAMESPACE, "version")
+
+
+def reference_data_changed(sender, **kwargs) -> None:
+    reset_reference_data()
+    # Other processes must not reload before the change is visible to them
+    transaction.on_commit(bump_version)
+
+
+for model in (Restaurant, Dish):
+    post_save.connect(reference_data_changed, sender=model, dispatch_uid=f"reference_data_saved.{model.__name__}")
+    post_delete.connect(reference_data_changed, sender=model, dispatch_uid=f"reference_data_deleted.{model.__name__}")
@@ -0,0 +1,100 @@
+"""Restaurant id -> provider integration, configured by `RESTAURANT_PROVIDERS`.
+
+Restaurants of `food.reference` are matched with their provider by name
+whenever the reference data is reloaded, so tasks and webhooks resolve a
+restaurant without touching the database.
+"""
+
+from dataclasses import dataclass
+from typing import Literal
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from shared.process import ProcessLocal
+
+from .enums import OrderStatus
+from .mapper import RESTAURANT_EXTERNAL_TO_INTERNAL
+from .providers.base import RestaurantProviderClient
+from .reference import ReferenceData, get_reference_data, reset_reference_data
+
+
+@dataclass(frozen=True)
+class RestaurantProvider:
+    name: str
+    restaurant_id: int
+    client: type[RestaurantProviderClient]
+    statuses: dict[str, OrderStatus]
+    # "webhook": the provider pushes status changes, "poll": `poll_provider_orders` asks for them
+    tracking: Literal["webhook", "poll"]
+    queue: str
+
+    def internal_status(self, status: str) -> OrderStatus:
+        return self.statuses[status]
+
+
+@dataclass
+class _ProcessProviders:
+    # Providers with the reference data they were built from. Replaced as a whole,
+    # so other threads never see providers of another reference data.
+    built: tuple[ReferenceData, dict[int, RestaurantProvider]] | None = None
+
+
+_providers: ProcessLocal[_ProcessProviders] = ProcessLocal(_ProcessProviders)
+
+
+def load_providers(reference: ReferenceData) -> dict[int, RestaurantProvider]:
+    providers = {}
+
+    for restaurant in reference.restaurants.values():
+        name = restaurant.name.lower()
+        config = settings.RESTAURANT_PROVIDERS.get(name)
+
+        if config is not None:
+            providers[restaurant.id] = RestaurantProvider(
+                name=name,
+                restaurant_id=restaurant.id,
+                client=import_string(config["client"]),
+                statuses=RESTAURANT_EXTERNAL_TO_INTERNAL[name],
+                tracking=config["tracking"],
+                queue=config["queue"],
+            )
+
+    return providers
+
+
+def get_providers(check: bool = False) -> dict[int, RestaurantProvider]:
+    process_providers = _providers.get()
+    reference = get_reference_data(check)
+    built = process_providers.built
+
+    if built is None or built[0] is not reference:
+        built = process_providers.built = (reference, load_providers(reference))
+
+    return built[1]
+
+
+def get_provider(restaurant_id: int) -> RestaurantProvider:
+    provider = get_providers().get(restaurant_id)
+
+    # The restaurant could be created or renamed in another process since the last version check
+    if provider is None:
+        provider = get_providers(check=True).get(restaurant_id)
+
+    if provider is None:
+        raise ValueError(f"Restaurant {restaurant_id} is not supported")
+
+    return provider
+
+
+def get_provider_by_name(name: str) -> RestaurantProvider:
+    for provider in get_providers().values():
+        if provider.name == name:
+            return provider
+
+    raise ValueError(f"Provider {name} is not configured")
+
+
+def reset_providers() -> None:
+    reset_reference_data()
+    _providers.reset()
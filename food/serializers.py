@@ -1,11 +1,16 @@
 from datetime import date
 
+from django.db.models import F, Prefetch, QuerySet, Window
+from django.db.models.functions import RowNumber
+
 # from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import LimitOffsetPagination
 
 from .models import Dish, Order, OrderItem, OrderStatus, Restaurant
+from .reference import DishRef, get_dish, get_reference_data
+from .registry import get_provider
 
 
 class DishSerializer(serializers.ModelSerializer):
@@ -21,25 +26,70 @@ class RestaurantSerializer(serializers.ModelSerializer):
         model = Restaurant
         fields = "__all__"
 
-    def get_dishes(self, obj):
-        request = self.context.get("request")
+    @staticmethod
+    def dishes_queryset(request) -> QuerySet[Dish]:
+        """Dishes matching `?search=`, a page of `?limit=` (`PAGE_SIZE`) per restaurant starting at `?offset=`.
+
+        The page is cut with a ROW_NUMBER() window per restaurant, so the dishes
+        of any number of restaurants are fetched with one query.
+        """
 
-        dishes = obj.dishes.all()
+        dishes = Dish.objects.all()
 
         search_query = request.query_params.get("search")
         if search_query:
             dishes = dishes.filter(name__icontains=search_query)
 
         paginator = LimitOffsetPagination()
-        paginator.limit_param = 2
+        limit, offset = paginator.get_limit(request), paginator.get_offset(request)
+
+        return (
+            dishes.annotate(position=Window(RowNumber(), partition_by=F("restaurant_id"), order_by=F("id").asc()))
+            .filter(position__gt=offset, position__lte=offset + limit)
+            .order_by("restaurant_id", "id")
+        )
+
+    @classmethod
+    def prefetch_dishes(cls, restaurants: QuerySet[Restaurant], request) -> QuerySet[Restaurant]:
+        return restaurants.prefetch_related(Prefetch("dishes", queryset=cls.dishes_queryset(request), to_attr="menu"))
+
+    def get_dishes(self, obj):
+        dishes = getattr(obj, "menu", None)
+
+        if dishes is None:
+            dishes = self.dishes_queryset(self.context.get("request")).filter(restaurant=obj)
+
+        return DishSerializer(dishes, many=True).data
 
-        page = paginator.paginate_queryset(dishes, request, view=self)
 
-        return DishSerializer(page, many=True).data
+class DishIdField(serializers.IntegerField):
+    """Dish id checked against `food.reference`, not with a query per order item.
+
+    Dishes of restaurants without a provider integration are rejected, they could never be ordered.
+    """
+
+    default_error_messages = {
+        "does_not_exist": 'Invalid pk "{pk_value}" - object does not exist.',
+        "not_supported": 'Dish "{pk_value}" - its restaurant does not take orders.',
+    }
+
+    def to_internal_value(self, data) -> int:
+        dish_id = super().to_internal_value(data)
+        dish = get_dish(dish_id)
+
+        if dish is None:
+            self.fail("does_not_exist", pk_value=dish_id)
+
+        try:
+            get_provider(dish.restaurant_id)
+        except ValueError:
+            self.fail("not_supported", pk_value=dish_id)
+
+        return dish_id
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    dish = serializers.PrimaryKeyRelatedField(queryset=Dish.objects.all())
+    dish = DishIdField(source="dish_id")
     quantity = serializers.IntegerField(min_value=1, max_value=20)
 
     class Meta:
@@ -54,6 +104,8 @@ class OrderSerializer(serializers.ModelSerializer):
     total = serializers.IntegerField(min_value=1, read_only=True)
     status = serializers.ChoiceField(OrderStatus.choices(), read_only=True)
     delivery_provider = serializers.CharField()
+    # Orders are always placed for the authenticated user
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = Order
@@ -61,10 +113,16 @@ class OrderSerializer(serializers.ModelSerializer):
 
     @property
     def calculated_total(self) -> int:
+        return self.items_total(self.validated_data["items"])
+
+    @staticmethod
+    def items_total(items: list[dict]) -> int:
         total = 0
 
-        for item in self.validated_data["items"]:
-            dish: Dish = item["dish"]
+        dishes = get_reference_data().dishes
+
+        for item in items:
+            dish: DishRef = dishes[item["dish_id"]]
             quantity: int = item["quantity"]
             total += dish.price * quantity
 
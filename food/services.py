@@ -1,232 +1,481 @@
-from dataclasses import asdict, dataclass, field
-from time import sleep
+import asyncio
+import time
+from collections import defaultdict
 
+import httpx
+from celery import group
 from celery.schedules import crontab
+from django.conf import settings
+from django.db import transaction
 
 from cateringproject import celery_app
-from food.providers import uklon
 from shared.cache import CacheService
 from shared.llm import LLMService
 from users.models import Role, User
 
 from .enums import OrderStatus
-from .mapper import RESTAURANT_EXTERNAL_TO_INTERNAL
-from .models import Dish, Order, OrderItem, Restaurant
-from .providers import kfc, silpo
+from .lifecycle import transition, transition_many
+from .models import Dish, Order, OrderItem
+from .providers import uklon
+from .providers.http import close_async_http_clients
+from .providers.resilience import ProviderUnavailable, is_upstream_failure, was_not_sent
+from .reference import get_dish, get_reference_data
+from .registry import RestaurantProvider, get_provider, get_providers
 from .serializers import DishSerializer, OrderSerializer
+from .tracking import TrackingOrder, TrackingStore
+from .webhooks import WebhookEvent, WebhookStream
 
 # from django.db.models import QuerySet
 
 
-@dataclass
-class TrackingOrder:
-    restaurants: dict = field(default_factory=dict)
-    delivery: dict = field(default_factory=dict)
+def restaurant_cooked(order_id: int, restaurant_id: int) -> bool:
+    """Called when a restaurant reports COOKED. Requests the delivery once all of them have."""
 
+    if not TrackingStore().mark_cooked(order_id, restaurant_id):
+        print(f"Order {order_id} is still cooking in other restaurants")
+        return False
 
-def all_orders_cooked(order_id: int):
-    cache = CacheService()
-    tracking_order = TrackingOrder(**cache.get(namespace="orders", key=str(order_id)))
-    print(f"Checking if all orders are cooked: {tracking_order.restaurants}")
-
-    if all((payload["status"] == OrderStatus.COOKED for _, payload in tracking_order.restaurants.items())):
-        Order.objects.filter(id=order_id).update(status=OrderStatus.COOKED)
+    if transition(order_id, OrderStatus.COOKED):
         print(f"Order {order_id} has been cooked.")
-
         order_delivery.delay(order_id)
 
-        return True
-    else:
-        print(f"Not all orders are cooked: {tracking_order=}")
+    return True
 
-        return False
 
+@celery_app.task(bind=True, queue="default", max_retries=settings.ORDER_PLACEMENT_RETRIES)
+def order_delivery(self, order_id: int):
+    """Request an Uklon driver and hand the delivery over to `track_delivery`.
 
-@celery_app.task(queue="default")
-def order_delivery(order_id: int):
-    print("DELIVERY PROCESSING")
+    An unavailable Uklon is retried every `ORDER_PLACEMENT_RETRY_DELAY` seconds. The order
+    is NOT_DELIVERED once the retries run out or Uklon rejects the request.
+    """
 
-    provider = uklon.Client()
-    cache = CacheService()
-    order = Order.objects.get(id=order_id)
+    print("DELIVERY PROCESSING")
 
-    order.status = OrderStatus.DELIVERY_LOOKUP
-    order.save()
+    # A retried task finds the order already waiting for a driver
+    if not transition(order_id, OrderStatus.DELIVERY_LOOKUP) and not (
+        self.request.retries and Order.objects.filter(pk=order_id, status=OrderStatus.DELIVERY_LOOKUP).exists()
+    ):
+        return
 
+    restaurants = get_reference_data().restaurants
     addresses: list[str] = []
     comments: list[str] = []
 
-    for rest_name, address in order.delivery_meta():
-        addresses.append(address)
-        comments.append(f"Delivery to the {rest_name}")
+    for restaurant_id in TrackingStore().get(order_id).restaurants:
+        restaurant = restaurants[int(restaurant_id)]
+        addresses.append(restaurant.address)
+        comments.append(f"Delivery to the {restaurant.name}")
+
+    try:
+        response: uklon.OrderResponse = uklon.Client.create_order(
+            uklon.OrderRequestBody(addresses=addresses, comments=comments),
+        )
+    except httpx.HTTPError as error:
+        unavailable = isinstance(error, ProviderUnavailable) or is_upstream_failure(error)
+
+        if unavailable and self.request.retries < self.max_retries:
+            print(f"Uklon order for {order_id} is not created: {error}. Retrying")
+            raise self.retry(exc=error, countdown=settings.ORDER_PLACEMENT_RETRY_DELAY)
+
+        print(f"Uklon order for {order_id} is not created: {error}")
+        TrackingStore().update_delivery(order_id, status=OrderStatus.NOT_DELIVERED)
+        transition(order_id, OrderStatus.NOT_DELIVERED)
+        return
 
-    order.status = OrderStatus.DELIVERED
-    order.save()
+    transition(order_id, OrderStatus.DELIVERY)
 
-    _response: uklon.OrderResponse = provider.create_order(
-        uklon.OrderRequestBody(addresses=addresses, comments=comments),
+    TrackingStore().update_delivery(
+        order_id, status=OrderStatus.DELIVERY, location=response.location, external_id=response.id
     )
 
-    tracking_order = TrackingOrder(**cache.get("orders", str(order.pk)))
-    tracking_order.delivery["status"] = OrderStatus.DELIVERY
-    tracking_order.delivery["location"] = _response.location
+    track_delivery.apply_async(
+        args=(order_id, response.id, list(response.location), time.time()),
+        countdown=settings.DELIVERY_POLL_MIN_INTERVAL,
+    )
+
+
+@celery_app.task(queue="default")
+def track_delivery(
+    order_id: int,
+    external_id: str,
+    location: list[float],
+    started_at: float,
+    interval: float | None = None,
+):
+    """One Uklon poll per run, rescheduled until the order is delivered.
+
+    The interval is reset to `DELIVERY_POLL_MIN_INTERVAL` while the courier moves
+    and grows by `DELIVERY_POLL_BACKOFF` up to `DELIVERY_POLL_MAX_INTERVAL` while it stands still.
+    """
+
+    tracking = TrackingStore()
+    interval = interval or settings.DELIVERY_POLL_MIN_INTERVAL
+
+    if time.time() - started_at > settings.DELIVERY_TIMEOUT:
+        print(f"Uklon order {external_id} is not delivered in time")
+        tracking.update_delivery(order_id, status=OrderStatus.NOT_DELIVERED)
+        transition(order_id, OrderStatus.NOT_DELIVERED)
+        return
+
+    try:
+        response: uklon.OrderResponse = uklon.Client.get_order(external_id)
+    except httpx.HTTPError as error:
+        print(f"Uklon tracking request failed: {error}")
+        response = None
 
-    current_status: uklon.OrderStatus = _response.status
+    if response is not None and response.status == uklon.OrderStatus.DELIVERED:
+        print(f"🏁 UKLON [{response.status}]: 📍 {response.location}")
 
-    while current_status != OrderStatus.DELIVERED:
-        response = provider.get_order(_response.id)
+        tracking.update_delivery(order_id, status=OrderStatus.DELIVERED, location=response.location)
+        transition(order_id, OrderStatus.DELIVERED)
 
+        print("✅ DONE with Delivery")
+        return
+
+    if response is not None and list(response.location) != location:
         print(f"🚙 Uklon [{response.status}]: 📍 {response.location}")
 
-        if current_status == response.status:
-            sleep(1)
-            continue
+        tracking.update_delivery(order_id, location=response.location)
+        location = list(response.location)
+        interval = settings.DELIVERY_POLL_MIN_INTERVAL
+    else:
+        interval = min(interval * settings.DELIVERY_POLL_BACKOFF, settings.DELIVERY_POLL_MAX_INTERVAL)
 
-        current_status = response.status
+    track_delivery.apply_async(args=(order_id, external_id, location, started_at, interval), countdown=interval)
 
-        tracking_order.delivery["location"] = response.location
 
-        cache.set("orders", str(order_id), asdict(tracking_order))
+@celery_app.task(bind=True, queue="high_priority", max_retries=settings.ORDER_PLACEMENT_RETRIES)
+def order_in_restaurant(self, order_id: int, restaurant_id: int, items: list[dict]):
+    """Place the order in the restaurant and hand its tracking over to the webhook or the poller.
 
-    print(f"🏁 UKLON [{response.status}]: 📍 {response.location}")
+    Only orders that never reached the provider are retried, every `ORDER_PLACEMENT_RETRY_DELAY`
+    seconds: after a timeout or a 5xx the provider may have accepted the order, and sending it
+    again would cook it twice. The order is FAILED once the retries run out or on any other error.
+    """
 
-    Order.objects.filter(id=order_id).update(status=OrderStatus.DELIVERED)
+    provider = get_provider(restaurant_id)
+    cache = CacheService()
+    tracking = TrackingStore(cache)
 
-    tracking_order.delivery["status"] = OrderStatus.DELIVERED
-    # cache.delete("orders", str(order_id))
+    restaurant_order = tracking.get(order_id).restaurants.get(str(restaurant_id))
+    if not restaurant_order:
+        raise ValueError(f"No {provider.name} in orders processing")
 
-    print("✅ DONE with Delivery")
+    # The task could be retried after the order was already placed
+    if not restaurant_order["external_id"]:
+        try:
+            response = provider.client.create_order(provider.client.order_request(items))
+        except httpx.HTTPError as error:
+            if was_not_sent(error) and self.request.retries < self.max_retries:
+                print(f"{provider.name} order for {order_id} is not created: {error}. Retrying")
+                raise self.retry(exc=error, countdown=settings.ORDER_PLACEMENT_RETRY_DELAY)
+
+            print(f"{provider.name} order for {order_id} is not created: {error}")
+            tracking.update_restaurant(order_id, restaurant_id, status=OrderStatus.FAILED)
+            transition(order_id, OrderStatus.FAILED)
+            return
+
+        internal_status = provider.internal_status(response.status)
+
+        with cache.batch():
+            tracking.update_restaurant(order_id, restaurant_id, external_id=response.id, status=internal_status)
+            if provider.tracking == "webhook":
+                cache.set(
+                    f"{provider.name}_orders", response.id, {"internal_order_id": order_id}, ttl=TrackingStore.TTL
+                )
 
+        restaurant_order = {"external_id": response.id, "status": internal_status}
 
-@celery_app.task(queue="high_priority")
-def order_in_silpo(order_id: int, items: list[dict]):
-    items = [OrderItem.objects.get(id=item["id"]) for item in items]
+        print(f"Created {provider.name} Order. External ID: {response.id} Status: {internal_status}")
 
-    client = silpo.Client()
-    cache = CacheService()
-    restaurant = Restaurant.objects.get(name="Silpo")
+    if provider.tracking == "poll":
+        tracking.start_polling(
+            provider.name, order_id, restaurant_id, restaurant_order["external_id"], restaurant_order["status"]
+        )
+        return
 
-    def get_internal_status(status: silpo.OrderStatus) -> OrderStatus:
-        return RESTAURANT_EXTERNAL_TO_INTERNAL["silpo"][status]
+    if restaurant_order["status"] == OrderStatus.COOKING:
+        transition(order_id, OrderStatus.COOKING)
+    if restaurant_order["status"] == OrderStatus.COOKED:
+        restaurant_cooked(order_id, restaurant_id)
 
-    cooked = False
-    while not cooked:
-        sleep(1)
 
-        tracking_order = TrackingOrder(**cache.get("orders", str(order_id)))
-        silpo_order = tracking_order.restaurants.get(str(restaurant.pk))
-        if not silpo_order:
-            raise ValueError("No Silpo in orders processing")
+async def fetch_provider_status(provider: RestaurantProvider, external_id: str) -> OrderStatus | None:
+    """Current internal status of the external order or `None` if the provider did not answer."""
 
-        print(f"CURRENT SILPO ORDER STATUS: {silpo_order['status']}")
+    try:
+        response = await provider.client.aget_order(external_id)
+    except httpx.HTTPError as error:
+        print(f"{provider.name} tracking request for {external_id} failed: {error}")
+        return None
+
+    return provider.internal_status(response.status)
+
+
+async def fetch_provider_statuses(provider: RestaurantProvider, external_ids: list[str]) -> list[OrderStatus | None]:
+    """Query the orders concurrently, at most `ORDER_POLL_CONCURRENCY` requests at a time."""
+
+    semaphore = asyncio.Semaphore(settings.ORDER_POLL_CONCURRENCY)
+
+    async def fetch(external_id: str) -> OrderStatus | None:
+        async with semaphore:
+            return await fetch_provider_status(provider, external_id)
+
+    try:
+        return await asyncio.gather(*(fetch(external_id) for external_id in external_ids))
+    finally:
+        await close_async_http_clients()
+
+
+def poll_provider(provider: RestaurantProvider, tracking: TrackingStore) -> None:
+    """Query every in-flight order of the provider concurrently and apply the changes in one batch."""
+
+    entries = tracking.polling(provider.name)
+    if not entries:
+        return
+
+    print(f"Polling {len(entries)} {provider.name} orders")
+
+    external_ids = [entry["external_id"] for entry in entries.values()]
+    statuses = dict(zip(entries, asyncio.run(fetch_provider_statuses(provider, external_ids))))
+
+    changed: dict[tuple[int, int], dict] = {}
+    finished: dict[tuple[int, int], OrderStatus] = {}
+    deadline = time.time() - settings.ORDER_COOKING_TIMEOUT
+
+    for key, entry in entries.items():
+        status = statuses[key] or entry["status"]
+
+        if status in (OrderStatus.COOKED, OrderStatus.FINISHED):
+            finished[key] = OrderStatus.COOKED
+        elif entry["started_at"] < deadline:
+            print(f"{provider.name} order {entry['external_id']} is not cooked in time")
+            finished[key] = OrderStatus.FAILED
+        elif status != entry["status"]:
+            changed[key] = entry | {"status": status}
+
+    if changed or finished:
+        apply_polled_statuses(provider.name, tracking, changed, finished)
 
-        if not silpo_order["external_id"]:
-            response: silpo.OrderResponse = client.create_order(
-                silpo.OrderRequestBody(
-                    order=[silpo.OrderItem(dish=item.dish.name, quantity=item.quantity) for item in items]
-                )
-            )
-            internal_status: OrderStatus = get_internal_status(response.status)
 
-            tracking_order.restaurants[str(restaurant.pk)] |= {
-                "external_id": response.id,
-                "status": internal_status,
-            }
+def apply_polled_statuses(
+    provider: str,
+    tracking: TrackingStore,
+    changed: dict[tuple[int, int], dict],
+    finished: dict[tuple[int, int], OrderStatus],
+) -> None:
+    """Write the tracking in one pipeline and the `orders` table with one UPDATE per status."""
 
-            cache.set("orders", str(order_id), asdict(tracking_order), ttl=3600)
-        else:
-            response = client.get_order(silpo_order["external_id"])
-            internal_status: OrderStatus = get_internal_status(response.status)
+    with tracking.cache.batch():
+        for (order_id, restaurant_id), entry in changed.items():
+            tracking.update_restaurant(order_id, restaurant_id, status=entry["status"])
+        for (order_id, restaurant_id), status in finished.items():
+            tracking.update_restaurant(order_id, restaurant_id, status=status)
 
-            print(f"Tracking for Silpo Order with HTTP GET /api/order. Status: {internal_status}")
+        tracking.update_polling(provider, changed)
+        tracking.stop_polling(provider, list(finished))
 
-            if silpo_order["status"] != internal_status:
-                tracking_order.restaurants[str(restaurant.pk)]["status"] = internal_status
-                print(f"Silpo order status changed to {internal_status}")
-                cache.set("orders", str(order_id), asdict(tracking_order), ttl=3600)
+    orders_by_status: dict[OrderStatus, set[int]] = defaultdict(set)
+    for (order_id, _), entry in changed.items():
+        if entry["status"] == OrderStatus.COOKING:
+            orders_by_status[OrderStatus.COOKING].add(order_id)
+    for (order_id, _), status in finished.items():
+        if status == OrderStatus.FAILED:
+            orders_by_status[OrderStatus.FAILED].add(order_id)
 
-                if internal_status == OrderStatus.COOKING:
-                    Order.objects.filter(id=order_id).update(status=OrderStatus.COOKING)
+    for status, order_ids in orders_by_status.items():
+        transition_many(order_ids, status)
 
-                if internal_status == OrderStatus.COOKED:
-                    cooked = True
-                    all_orders_cooked(order_id)
+    for (order_id, restaurant_id), status in finished.items():
+        if status == OrderStatus.COOKED:
+            restaurant_cooked(order_id, restaurant_id)
 
 
 @celery_app.task(queue="high_priority")
-def order_in_kfc(order_id: int, items: list[dict]):
-    client = kfc.Client()
+def poll_provider_orders():
+    """Beat task: one pass over the in-flight orders of every polled provider.
+
+    A lock keeps overlapping runs (slow providers, several beat instances) from polling twice.
+    """
+
     cache = CacheService()
-    restaurant = Restaurant.objects.get(name="KFC")
 
-    def get_internal_status(status: silpo.OrderStatus) -> OrderStatus:
-        return RESTAURANT_EXTERNAL_TO_INTERNAL["kfc"][status]
+    with cache.lock("poll_provider_orders", ttl=settings.ORDER_POLL_LOCK_TTL) as acquired:
+        if not acquired:
+            print("Provider orders are already being polled")
+            return
 
-    tracking_order = TrackingOrder(**cache.get(namespace="orders", key=str(order_id)))
+        tracking = TrackingStore(cache)
 
-    response: kfc.OrderResponse = client.create_order(
-        kfc.OrderRequestBody(
-            order=[kfc.OrderItem(dish=item["dish__name"], quantity=item["quantity"]) for item in items]
-        )
-    )
-    internal_status = get_internal_status(response.status)
-
-    tracking_order.restaurants[str(restaurant.pk)] |= {
-        "external_id": response.id,
-        "status": internal_status,
-    }
-
-    print(f"Created KFC Order. External ID: {response.id} Status: {internal_status}")
-    cache.set("orders", str(order_id), asdict(tracking_order), ttl=3600)
-
-    cache.set(
-        namespace="kfc_orders",
-        key=response.id,
-        value={
-            "internal_order_id": order_id,
-        },
-        ttl=3600,
+        for provider in get_providers().values():
+            if provider.tracking == "poll":
+                poll_provider(provider, tracking)
+
+
+# Restaurant statuses from the least to the most advanced
+RESTAURANT_PROGRESS = (OrderStatus.NOT_STARTED, OrderStatus.COOKING, OrderStatus.COOKED, OrderStatus.FINISHED)
+
+
+def apply_webhook_events(events: list[WebhookEvent], tracking: TrackingStore) -> None:
+    """Apply a batch of webhook events: one MGET, one tracking pipeline and one UPDATE per status."""
+
+    providers = {provider.name: provider for provider in get_providers().values()}
+    # Duplicates (retried callbacks) are dropped, the order of the rest is kept
+    events = list(dict.fromkeys(events))
+
+    # The restaurant of the provider could be removed while its events were queued
+    for provider_name in {event.provider for event in events} - providers.keys():
+        print(f"Webhook events of unknown provider {provider_name} are skipped")
+    events = [event for event in events if event.provider in providers]
+
+    orders = tracking.cache.get_many([(f"{event.provider}_orders", event.external_id) for event in events])
+
+    statuses: dict[tuple[int, int], tuple[str, OrderStatus]] = {}
+    for event in events:
+        external_order = orders[(f"{event.provider}_orders", event.external_id)]
+        if not external_order:
+            print(f"{event.provider} webhook received for unknown order_id={event.external_id}")
+            continue
+
+        provider = providers[event.provider]
+        key = (external_order["internal_order_id"], provider.restaurant_id)
+        status = provider.internal_status(event.status)
+
+        # A late retry of an earlier status must not hide the COOKED one of the same batch
+        previous = statuses.get(key)
+        if previous is None or RESTAURANT_PROGRESS.index(status) >= RESTAURANT_PROGRESS.index(previous[1]):
+            statuses[key] = (event.external_id, status)
+
+    with tracking.cache.batch():
+        for (order_id, restaurant_id), (external_id, status) in statuses.items():
+            tracking.update_restaurant(order_id, restaurant_id, external_id=external_id, status=status)
+
+    transition_many(
+        {order_id for (order_id, _), (_, status) in statuses.items() if status == OrderStatus.COOKING},
+        OrderStatus.COOKING,
     )
 
-    if all_orders_cooked(order_id):
-        cache.set(namespace="orders", key=str(order_id), value=asdict(tracking_order), ttl=3600)
-        Order.objects.filter(id=order_id).update(status=OrderStatus.COOKED)
+    for (order_id, restaurant_id), (_, status) in statuses.items():
+        if status == OrderStatus.COOKED:
+            restaurant_cooked(order_id, restaurant_id)
+
 
+@celery_app.task(queue="high_priority")
+def drain_webhook_events():
+    """Beat task: apply the webhook events received since the last run, `WEBHOOK_BATCH_SIZE` at a time."""
 
-def schedule_order(order: Order):
     cache = CacheService()
+
+    with cache.lock("drain_webhook_events", ttl=settings.WEBHOOK_LOCK_TTL) as acquired:
+        if not acquired:
+            print("Webhook events are already being drained")
+            return
+
+        stream = WebhookStream(cache)
+        tracking = TrackingStore(cache)
+
+        while batch := stream.read(settings.WEBHOOK_BATCH_SIZE):
+            apply_webhook_events([event for _, event in batch], tracking)
+            stream.commit(batch[-1][0])
+
+            if len(batch) < settings.WEBHOOK_BATCH_SIZE:
+                break
+
+
+@celery_app.task(queue="high_priority")
+def schedule_order(order_id: int):
+    """Create the order tracking and place the order in every restaurant in parallel."""
+
+    items_by_restaurant: dict[int, list[dict]] = defaultdict(list)
     tracking_order = TrackingOrder()
+    restaurant_tasks = []
+
+    for item in OrderItem.objects.filter(order_id=order_id).values("id", "dish_id", "quantity"):
+        dish = get_dish(item["dish_id"])
+
+        # Missing even after a version check, e.g. the change that created it was not bumped yet
+        if dish is None:
+            print(f"Order {order_id} is not placed: dish {item['dish_id']} does not exist")
+            transition(order_id, OrderStatus.FAILED)
+            return
+
+        items_by_restaurant[dish.restaurant_id].append(
+            {"id": item["id"], "dish__name": dish.name, "quantity": item["quantity"]}
+        )
+
+    # A restaurant can lose its provider after the order was validated, e.g. when it is renamed
+    try:
+        providers = {restaurant_id: get_provider(restaurant_id) for restaurant_id in items_by_restaurant}
+    except ValueError as error:
+        print(f"Order {order_id} is not placed: {error}")
+        transition(order_id, OrderStatus.FAILED)
+        return
+
+    for restaurant_id, items in items_by_restaurant.items():
+        restaurant_tasks.append(
+            order_in_restaurant.s(order_id, restaurant_id, items).set(queue=providers[restaurant_id].queue)
+        )
 
-    items_by_restaurants = order.items_by_restaurant()
-    for restaurant, items in items_by_restaurants.items():
-        tracking_order.restaurants[str(restaurant.pk)] = {
+        tracking_order.restaurants[str(restaurant_id)] = {
             "external_id": None,
             "status": OrderStatus.NOT_STARTED,
         }
 
-    cache.set("orders", str(order.pk), asdict(tracking_order), ttl=3600)
+    TrackingStore().create(order_id, tracking_order)
+
+    group(restaurant_tasks).apply_async()
 
-    for restaurant, items in items_by_restaurants.items():
-        match restaurant.name.lower():
-            case "kfc":
-                # order_in_kfc.delay(order.pk, list(items.values("id", "dish__name", "quantity")))
-                order_in_kfc(order.pk, list(items.values("id", "dish__name", "quantity")))
-            case "silpo":
-                order_in_silpo.delay(order.pk, list(items.values("id", "dish__name", "quantity")))
-            case _:
-                raise ValueError(f"Restaurant {restaurant.name} is not supported")
+
+@celery_app.task(queue="high_priority")
+def schedule_orders(order_ids: list[int]):
+    """Schedule a batch of orders submitted together, with one broker message for all of them."""
+
+    for order_id in order_ids:
+        # One order that cannot be scheduled must not hold back the rest of the batch
+        try:
+            schedule_order(order_id)
+        except Exception as error:
+            print(f"Order {order_id} is not placed: {error}")
+            transition(order_id, OrderStatus.FAILED)
+
+
+def create_orders(user: User, orders: list[dict]) -> list[Order]:
+    """Insert validated `OrderSerializer` data with one INSERT for the orders and one for their items."""
+
+    with transaction.atomic():
+        created = Order.objects.bulk_create(
+            [
+                Order(
+                    status=OrderStatus.NOT_STARTED,
+                    user=user,
+                    delivery_provider="uklon",
+                    eta=order["eta"],
+                    total=OrderSerializer.items_total(order["items"]),
+                )
+                for order in orders
+            ]
+        )
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, dish_id=item["dish_id"], quantity=item["quantity"])
+                for order, data in zip(created, orders)
+                for item in data["items"]
+            ]
+        )
+
+    return created
 
 
 def get_food_recommendations(user_id: int) -> dict:
     cache = CacheService()
 
-    try:
-        items = cache.get("recommendations", str(user_id))
-        if items and "dishes" in items:
-            return {"recommendations": items["dishes"]}
-    except TypeError:
-        print("There is no data with recommendations in the cache")
-        return {"recommendations": []}
+    items = cache.get("recommendations", str(user_id))
+    if items and "dishes" in items:
+        return {"recommendations": items["dishes"]}
+
+    print("There is no data with recommendations in the cache")
+    return {"recommendations": []}
 
 
 @celery_app.task(queue="default")
@@ -286,5 +535,13 @@ celery_app.conf.beat_schedule = {
         "task": "food.services.generate_recommendations",
         "schedule": crontab(hour=0),
     },
+    "poll-provider-orders": {
+        "task": "food.services.poll_provider_orders",
+        "schedule": settings.ORDER_POLL_INTERVAL,
+    },
+    "drain-webhook-events": {
+        "task": "food.services.drain_webhook_events",
+        "schedule": settings.WEBHOOK_DRAIN_INTERVAL,
+    },
 }
 celery_app.conf.timezone = "UTC"
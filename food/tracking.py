@@ -0,0 +1,165 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.conf import settings
+
+from shared.cache import CacheService
+
+from .enums import OrderStatus
+
+
+@dataclass
+class TrackingOrder:
+    restaurants: dict = field(default_factory=dict)
+    delivery: dict = field(default_factory=dict)
+
+    def to_fields(self) -> dict[str, Any]:
+        """Flatten into hash fields: `restaurants.<id>.<name>` and `delivery.<name>`."""
+
+        fields = {}
+
+        for restaurant_id, payload in self.restaurants.items():
+            for name, value in payload.items():
+                fields[f"restaurants.{restaurant_id}.{name}"] = value
+
+        for name, value in self.delivery.items():
+            fields[f"delivery.{name}"] = value
+
+        return fields
+
+    @classmethod
+    def from_fields(cls, fields: dict[str, Any]) -> "TrackingOrder":
+        tracking_order = cls()
+
+        for path, value in fields.items():
+            match path.split("."):
+                case ["restaurants", restaurant_id, name]:
+                    tracking_order.restaurants.setdefault(restaurant_id, {})[name] = value
+                case ["delivery", name]:
+                    tracking_order.delivery[name] = value
+
+        return tracking_order
+
+
+class TrackingStore:
+    """Order tracking kept in the `orders:<id>` Redis hash.
+
+    Every restaurant and delivery attribute is a separate hash field, so
+    concurrent workers update their own part of the order without
+    rewriting (and overwriting) the rest of it.
+    """
+
+    NAMESPACE = "orders"
+    TTL = 3600
+    # `pending_restaurants:<id>` set of the restaurants that have not cooked their part yet
+    PENDING_NAMESPACE = "pending_restaurants"
+    # Every change is also appended to the `order_events:<id>` stream for live subscribers
+    EVENTS_NAMESPACE = "order_events"
+    EVENTS_MAXLEN = 1000
+    # `polling:<provider>` hash of in-flight external orders, one `<order id>.<restaurant id>` field each
+    POLLING_NAMESPACE = "polling"
+
+    def __init__(self, cache: CacheService | None = None):
+        self.cache: CacheService = cache or CacheService()
+
+    def _write(self, order_id: int, fields: dict[str, Any], replace: bool = False) -> None:
+        with self.cache.batch():
+            self.cache.set_fields(self.NAMESPACE, str(order_id), fields, ttl=self.TTL, replace=replace)
+            if fields:
+                self.cache.append_event(
+                    self.EVENTS_NAMESPACE, str(order_id), fields, maxlen=self.EVENTS_MAXLEN, ttl=self.TTL
+                )
+
+    @property
+    def pending_ttl(self) -> int:
+        """The pending restaurants outlive the slowest kitchen, or the last one to cook never completes the order."""
+
+        return settings.ORDER_COOKING_TIMEOUT + self.TTL
+
+    def create(self, order_id: int, tracking_order: TrackingOrder) -> None:
+        with self.cache.batch():
+            self._write(order_id, tracking_order.to_fields(), replace=True)
+            self.cache.add_members(
+                self.PENDING_NAMESPACE, str(order_id), tracking_order.restaurants, ttl=self.pending_ttl, replace=True
+            )
+
+    def mark_cooked(self, order_id: int, restaurant_id: int) -> bool:
+        """Drop the restaurant from the pending ones. `True` only for the call that cooked the last one.
+
+        Repeated or concurrent reports of the same restaurant never return `True` twice.
+        """
+
+        removed, remaining = self.cache.remove_member(
+            self.PENDING_NAMESPACE, str(order_id), str(restaurant_id), ttl=self.pending_ttl
+        )
+
+        return removed and remaining == 0
+
+    def get(self, order_id: int) -> TrackingOrder:
+        return TrackingOrder.from_fields(self.cache.get_fields(self.NAMESPACE, str(order_id)))
+
+    def update_restaurant(
+        self,
+        order_id: int,
+        restaurant_id: int,
+        *,
+        status: OrderStatus | None = None,
+        external_id: str | None = None,
+    ) -> None:
+        fields: dict[str, Any] = {}
+
+        if status is not None:
+            fields[f"restaurants.{restaurant_id}.status"] = status
+        if external_id is not None:
+            fields[f"restaurants.{restaurant_id}.external_id"] = external_id
+
+        self._write(order_id, fields)
+
+    def update_delivery(
+        self,
+        order_id: int,
+        *,
+        status: OrderStatus | None = None,
+        location: tuple[float, float] | None = None,
+        external_id: str | None = None,
+    ) -> None:
+        fields: dict[str, Any] = {}
+
+        if status is not None:
+            fields["delivery.status"] = status
+        if location is not None:
+            fields["delivery.location"] = location
+        if external_id is not None:
+            fields["delivery.external_id"] = external_id
+
+        self._write(order_id, fields)
+
+    def start_polling(
+        self,
+        provider: str,
+        order_id: int,
+        restaurant_id: int,
+        external_id: str,
+        status: OrderStatus,
+    ) -> None:
+        """Hand the external order over to `poll_provider_orders`."""
+
+        entry = {"external_id": external_id, "status": status, "started_at": time.time()}
+        self.cache.set_fields(self.POLLING_NAMESPACE, provider, {f"{order_id}.{restaurant_id}": entry})
+
+    def polling(self, provider: str) -> dict[tuple[int, int], dict]:
+        """In-flight orders of the provider keyed by `(order_id, restaurant_id)`."""
+
+        entries = self.cache.get_fields(self.POLLING_NAMESPACE, provider)
+
+        return {tuple(map(int, field_.split("."))): entry for field_, entry in entries.items()}
+
+    def update_polling(self, provider: str, entries: dict[tuple[int, int], dict]) -> None:
+        mapping = {f"{order_id}.{restaurant_id}": entry for (order_id, restaurant_id), entry in entries.items()}
+        if mapping:
+            self.cache.set_fields(self.POLLING_NAMESPACE, provider, mapping)
+
+    def stop_polling(self, provider: str, keys: list[tuple[int, int]]) -> None:
+        fields = [f"{order_id}.{restaurant_id}" for order_id, restaurant_id in keys]
+        self.cache.delete_fields(self.POLLING_NAMESPACE, provider, fields)
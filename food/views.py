@@ -1,36 +1,59 @@
 import csv
+import hashlib
 import io
 import json
+from collections.abc import AsyncIterator
 from dataclasses import asdict
+from functools import partial
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
 
 # from rest_framework.exceptions import ValidationError
 from django.db import transaction
-from django.http import JsonResponse
+from django.http import HttpRequest, JsonResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
 from django.shortcuts import redirect
+from django.utils.http import parse_etags
 from django.views.decorators.csrf import csrf_exempt
 from django_filters import rest_framework
 from rest_framework import permissions, routers, viewsets
 from rest_framework.decorators import action
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.request import Request
 from rest_framework.response import Response
 
 # from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 
-from shared.cache import CacheService
+from shared.async_cache import AsyncCacheService
+from shared.cache import CacheService, cache_stats, pool_stats
+from shared.metrics import get_metrics
+from shared.streams import get_stream_fanout
 from users.models import Role, User
 
-from .mapper import RESTAURANT_EXTERNAL_TO_INTERNAL
-from .models import Dish, Order, OrderItem, OrderStatus, Restaurant
-from .providers import kfc
+from .lifecycle import FINAL_STATUSES
+from .models import Dish, Order, OrderStatus, Restaurant
+from .providers import uklon
+from .providers.resilience import breaker_states
+from .reference import current_version
+from .registry import get_provider_by_name, get_providers
 from .serializers import DishSerializer, OrderSerializer, RestaurantSerializer
 from .services import (
-    TrackingOrder,
-    all_orders_cooked,
+    create_orders,
     generate_recommendations,
     get_food_recommendations,
     schedule_order,
+    schedule_orders,
 )
+from .tracking import TrackingOrder, TrackingStore
+from .webhooks import WebhookEvent, WebhookStream
+
+FINAL_DELIVERY_STATUSES = (OrderStatus.DELIVERED, OrderStatus.NOT_DELIVERED)
+ORDER_EVENTS_TOKEN_SALT = "food.order_events"
 
 
 class RestaurantFilters(rest_framework.FilterSet):
@@ -39,6 +62,28 @@ class RestaurantFilters(rest_framework.FilterSet):
         fields = ["name"]
 
 
+def menu_cache_key(request: Request, version: int) -> str:
+    """Menu version plus the normalised parameters the listing depends on."""
+
+    paginator = LimitOffsetPagination()
+    params = {
+        "name": request.query_params.get("name", ""),
+        "search": request.query_params.get("search", ""),
+        "limit": paginator.get_limit(request),
+        "offset": paginator.get_offset(request),
+    }
+
+    return f"{version}:{hashlib.sha256(urlencode(params).encode()).hexdigest()}"
+
+
+def make_etag(data) -> str:
+    """Strong ETag: the hash of the canonical JSON of the response data."""
+
+    payload = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+    return f'"{hashlib.sha256(payload).hexdigest()[:32]}"'
+
+
 class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         user = request.user
@@ -53,7 +98,7 @@ class FoodAPIViewSet(viewsets.GenericViewSet):
 
     def get_permissions(self):
         match self.action:
-            case "all_orders" | "recommendations_generate":
+            case "all_orders" | "recommendations_generate" | "metrics":
                 return [permissions.IsAuthenticated(), IsAdmin()]
             case _:
                 return [permissions.IsAuthenticated()]
@@ -64,31 +109,59 @@ class FoodAPIViewSet(viewsets.GenericViewSet):
         serializer.is_valid(raise_exception=True)
 
         assert type(request.user) is User
-        print("create_order")
-        with transaction.atomic():
-            order = Order.objects.create(
-                status=OrderStatus.NOT_STARTED,
-                user=request.user,
-                delivery_provider="uklon",
-                eta=serializer.validated_data["eta"],
-                total=serializer.calculated_total,
-            )
-
-            items = serializer.validated_data["items"]
-            for dish_order in items:
-                instance = OrderItem.objects.create(
-                    dish=dish_order["dish"],
-                    quantity=dish_order["quantity"],
-                    order=order,
-                )
-                print(f"New Dish Order Item is created: {instance.pk}")
+        (order,) = create_orders(request.user, [serializer.validated_data])
 
-        print(f"New Food Order is created: {order.pk}. ETA: {order.eta}")
+        # Restaurants are called by the workers, once the order is visible to them
+        transaction.on_commit(partial(schedule_order.delay, order.pk))
 
-        schedule_order(order)
+        print(f"New Food Order is created: {order.pk}. ETA: {order.eta}")
 
         return Response(OrderSerializer(order).data, status=201)
 
+    @action(
+        methods=["post"],
+        detail=False,
+        url_path=r"orders/(?P<order_id>\d+)/events/token",
+        url_name="order-events-token",
+    )
+    def order_events_token(self, request: Request, order_id: str) -> Response:
+        """Short-lived token of the order events stream, for EventSource that cannot send the JWT header."""
+
+        assert type(request.user) is User
+        orders = Order.objects.filter(pk=order_id)
+        if request.user.role != Role.ADMIN:
+            orders = orders.filter(user=request.user)
+
+        if not orders.exists():
+            return Response({"detail": "Not found."}, status=404)
+
+        return Response(
+            {
+                "token": signing.dumps(int(order_id), salt=ORDER_EVENTS_TOKEN_SALT),
+                "expires_in": settings.ORDER_EVENTS_TOKEN_TTL,
+            }
+        )
+
+    @action(methods=["post"], detail=False, url_path=r"orders/bulk", url_name="orders-bulk")
+    def create_orders_bulk(self, request: Request) -> Response:
+        serializer = OrderSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=settings.ORDERS_BULK_MAX_SIZE
+        )
+        serializer.is_valid(raise_exception=True)
+
+        assert type(request.user) is User
+        orders = create_orders(request.user, serializer.validated_data)
+        order_ids = [order.pk for order in orders]
+
+        transaction.on_commit(partial(schedule_orders.delay, order_ids))
+
+        print(f"{len(orders)} Food Orders are created: {order_ids}")
+
+        return Response(
+            OrderSerializer(Order.objects.filter(pk__in=order_ids).prefetch_related("items"), many=True).data,
+            status=201,
+        )
+
     # @action(methods=["get"], detail=False)
     # def dishes(self, request: Request) -> Response:
     #     restaurants = Restaurant.objects.all()
@@ -109,12 +182,25 @@ class FoodAPIViewSet(viewsets.GenericViewSet):
             return Response(DishSerializer(serializer.instance).data, status=201)
 
         if request.method == "GET":
-            restaurants = Restaurant.objects.all()
+            cache = CacheService()
+            key = menu_cache_key(request, current_version(cache))
+            menu = cache.get("menu", key)
 
-            filtered_queryset = RestaurantFilters(request.GET, queryset=restaurants).qs
+            if menu is None:
+                restaurants = Restaurant.objects.all()
 
-            serializer = RestaurantSerializer(filtered_queryset, many=True, context={"request": request})
-            return Response(data=serializer.data)
+                filtered_queryset = RestaurantFilters(request.GET, queryset=restaurants).qs
+                filtered_queryset = RestaurantSerializer.prefetch_dishes(filtered_queryset, request)
+
+                serializer = RestaurantSerializer(filtered_queryset, many=True, context={"request": request})
+                menu = {"etag": make_etag(serializer.data), "data": serializer.data}
+                cache.set("menu", key, menu, ttl=settings.MENU_CACHE_TTL)
+
+            if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+            if menu["etag"] in if_none_match or "*" in if_none_match:
+                return Response(status=304, headers={"ETag": menu["etag"]})
+
+            return Response(data=menu["data"], headers={"ETag": menu["etag"]})
 
     @action(methods=["post"], detail=False, url_path=r"recommendations/generate")
     def recommendations_generate(self, request: Request) -> Response:
@@ -128,6 +214,21 @@ class FoodAPIViewSet(viewsets.GenericViewSet):
 
         return Response(data=recommendations)
 
+    @action(methods=["get"], detail=False, url_path=r"metrics")
+    def metrics(self, request: Request) -> Response:
+        """Metrics of the process that served the request."""
+
+        return Response(
+            data={
+                "metrics": get_metrics().snapshot(),
+                "cache": cache_stats(),
+                "redis_pool": pool_stats(),
+                "circuit_breakers": breaker_states(
+                    [provider.client.name for provider in get_providers().values()] + [uklon.Client.name]
+                ),
+            }
+        )
+
 
 # @api_view(["POST"])
 # @permission_classes([IsAdmin])
@@ -164,47 +265,127 @@ def import_dishes(request):
 
 
 @csrf_exempt
-def kfc_webhook(request):
-    print("KFC Webhook is Handled")
+def provider_webhook(request, provider: str):
+    """Validate the status update and queue it for `drain_webhook_events`. Nothing else runs in the request."""
 
     try:
         data = json.loads(request.body)
     except json.JSONDecodeError:
         return JsonResponse({"error": "Invalid JSON"}, status=400)
 
-    print(f"KFC webhook payload: {data}")
+    try:
+        event = WebhookEvent.parse(get_provider_by_name(provider), data)
+    except ValueError as error:
+        return JsonResponse({"error": str(error)}, status=400)
+
+    WebhookStream().append(event)
 
-    external_id = data.get("id") or data.get("order_id")
-    if not external_id:
-        return JsonResponse({"error": "Missing external_id"}, status=400)
+    return JsonResponse({"message": "ok"})
 
-    cache = CacheService()
-    restaurant = Restaurant.objects.get(name="KFC")
-    kfc_cache_order = cache.get("kfc_orders", key=external_id)
 
-    if not kfc_cache_order:
-        print(f"KFC webhook received for unknown order_id={external_id}")
-        return JsonResponse({"error": "Order not found"}, status=404)
+def format_event(data: dict, event: str, event_id: str | None = None) -> str:
+    lines = [f"id: {event_id}"] if event_id else []
 
-    def get_internal_status(status: kfc.OrderStatus) -> OrderStatus:
-        return RESTAURANT_EXTERNAL_TO_INTERNAL["kfc"][status]
+    return "\n".join([*lines, f"event: {event}", f"data: {json.dumps(data)}", "", ""])
 
-    order: Order = Order.objects.get(id=kfc_cache_order["internal_order_id"])
-    tracking_order = TrackingOrder(**cache.get(namespace="orders", key=str(order.pk)))
 
-    internal_status: OrderStatus = get_internal_status(data["status"])
-    print(f"Mapped internal status: {internal_status}")
-    tracking_order.restaurants[str(restaurant.pk)] |= {
-        "external_id": data["id"],
-        "status": internal_status,
-    }
+def is_order_events_token(token: str, order_id: int) -> bool:
+    """Whether the `token` was issued for the events of this order within `ORDER_EVENTS_TOKEN_TTL` seconds."""
 
-    cache.set(namespace="orders", key=str(order.pk), value=asdict(tracking_order), ttl=3600)
+    try:
+        return signing.loads(token, salt=ORDER_EVENTS_TOKEN_SALT, max_age=settings.ORDER_EVENTS_TOKEN_TTL) == order_id
+    except signing.BadSignature:
+        return False
 
-    if internal_status == OrderStatus.COOKED:
-        all_orders_cooked(order.pk)
 
-    return JsonResponse({"message": "ok"})
+async def authenticate_token(request: HttpRequest) -> User | None:
+    """User of the JWT in the `Authorization` header."""
+
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if not raw_token:
+        return None
+
+    try:
+        return await sync_to_async(authentication.get_user)(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def order_is_final(order_id: int) -> bool:
+    """FAILED, cancelled or delivered: nothing will be streamed for the order anymore."""
+
+    return await Order.objects.filter(pk=order_id, status__in=FINAL_STATUSES).aexists()
+
+
+async def stream_order_events(order_id: int, last_event_id: str | None) -> AsyncIterator[str]:
+    cache = AsyncCacheService()
+    key = str(order_id)
+
+    # A new subscriber gets the whole tracking first, reconnecting ones only what they missed
+    if last_event_id is None:
+        last_event_id = await cache.last_event_id(TrackingStore.EVENTS_NAMESPACE, key) or "0"
+        tracking_order = TrackingOrder.from_fields(await cache.get_fields(TrackingStore.NAMESPACE, key))
+
+        yield format_event(asdict(tracking_order), "snapshot", last_event_id)
+
+    if await order_is_final(order_id):
+        return
+
+    # One reader per process waits for the events of every open stream
+    async with get_stream_fanout(TrackingStore.EVENTS_NAMESPACE).subscribe(key, last_event_id) as events:
+        while True:
+            event = await events.get(timeout=settings.ORDER_EVENTS_HEARTBEAT)
+
+            if event is None:
+                # Orders can end without a tracking event, e.g. cancelled or failed on cooking timeout
+                if await order_is_final(order_id):
+                    return
+
+                yield ": heartbeat\n\n"
+                continue
+
+            last_event_id, fields = event
+            yield format_event(fields, "tracking", last_event_id)
+
+            if fields.get("delivery.status") in FINAL_DELIVERY_STATUSES:
+                return
+
+
+async def order_events(request: HttpRequest, order_id: int) -> HttpResponseBase:
+    """Server-Sent Events with the live tracking of the order, one `tracking` event per change.
+
+    Authenticated with the JWT header or, since EventSource cannot set headers, with the
+    `?token=` issued by `POST /food/orders/<id>/events/token/`. The JWT itself is never
+    accepted in the URL, where it would end up in access logs and the browser history.
+    """
+
+    stream_token = request.GET.get("token")
+
+    if stream_token is not None:
+        if not is_order_events_token(stream_token, order_id):
+            return JsonResponse({"detail": "Invalid or expired stream token."}, status=401)
+    else:
+        user = await authenticate_token(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+        orders = Order.objects.filter(id=order_id)
+        if user.role != Role.ADMIN:
+            orders = orders.filter(user=user)
+
+        if not await orders.aexists():
+            return JsonResponse({"detail": "Not found."}, status=404)
+
+    response = StreamingHttpResponse(
+        stream_order_events(order_id, request.headers.get("Last-Event-ID")),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+
+    return response
 
 
 router = routers.DefaultRouter()
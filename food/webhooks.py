@@ -0,0 +1,62 @@
+"""Provider webhooks are acknowledged as soon as they are appended to a Redis stream.
+
+`drain_webhook_events` (Celery beat) reads the `webhook_events:stream` entries after
+the last applied one, drops duplicates and applies every batch at once. The cursor
+only moves after a batch is applied, so a crashed worker leaves its events for the next run.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from django.conf import settings
+
+from shared.cache import CacheService
+
+from .registry import RestaurantProvider
+
+
+@dataclass(frozen=True)
+class WebhookEvent:
+    provider: str
+    external_id: str
+    # Status of the provider, mapped to the internal one when the event is applied
+    status: str
+
+    @classmethod
+    def parse(cls, provider: RestaurantProvider, payload: Any) -> "WebhookEvent":
+        """Validate the webhook payload. Raises `ValueError` when it is not a status update we know."""
+
+        if not isinstance(payload, dict):
+            raise ValueError("Invalid payload")
+
+        external_id = payload.get("id") or payload.get("order_id")
+        if not external_id:
+            raise ValueError("Missing external_id")
+
+        if payload.get("status") not in provider.statuses:
+            raise ValueError(f"Unknown status: {payload.get('status')}")
+
+        return cls(provider=provider.name, external_id=str(external_id), status=payload["status"])
+
+
+class WebhookStream:
+    NAMESPACE = "webhook_events"
+
+    def __init__(self, cache: CacheService | None = None):
+        self.cache: CacheService = cache or CacheService()
+
+    def append(self, event: WebhookEvent) -> None:
+        self.cache.append_event(self.NAMESPACE, "stream", asdict(event), maxlen=settings.WEBHOOK_EVENTS_MAXLEN)
+
+    def read(self, count: int) -> list[tuple[str, WebhookEvent]]:
+        """Up to `count` events after the last applied one."""
+
+        cursor = self.cache.get(self.NAMESPACE, "cursor")
+        events = self.cache.read_events(
+            self.NAMESPACE, "stream", last_id=cursor["last_id"] if cursor else "0", count=count
+        )
+
+        return [(event_id, WebhookEvent(**value)) for event_id, value in events]
+
+    def commit(self, last_id: str) -> None:
+        self.cache.set(self.NAMESPACE, "cursor", {"last_id": last_id})
@@ -0,0 +1,300 @@
+import time
+from collections.abc import AsyncIterator, Iterable
+from contextlib import asynccontextmanager
+from typing import Any
+
+import redis.asyncio as aioredis
+import redis.exceptions
+from django.conf import settings
+
+from shared.cache import (
+    INVALIDATION_CHANNEL,
+    CacheKey,
+    CacheService,
+    _process_origin,
+    decode_events,
+    decode_remote_many,
+    decode_streams,
+    get_local_cache,
+    get_memory_redis,
+    read_local_many,
+    record_read,
+    uses_memory_backend,
+)
+from shared.codecs import get_serializer
+from shared.local_cache import MISSING, LocalCache
+from shared.memory_redis import AsyncMemoryRedis
+from shared.metrics import MetricsSink, get_metrics
+from shared.process import LoopLocal
+
+
+def _create_async_connection_pool() -> aioredis.ConnectionPool:
+    return aioredis.ConnectionPool.from_url(
+        settings.CACHE_REDIS_URL,
+        max_connections=settings.CACHE_REDIS_MAX_CONNECTIONS,
+        health_check_interval=settings.CACHE_REDIS_HEALTH_CHECK_INTERVAL,
+        socket_timeout=settings.CACHE_REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.CACHE_REDIS_SOCKET_TIMEOUT,
+    )
+
+
+_pools: LoopLocal[aioredis.ConnectionPool] = LoopLocal(_create_async_connection_pool)
+
+
+def get_async_connection_pool() -> aioredis.ConnectionPool:
+    """Return the process-wide asyncio Redis pool of the running event loop."""
+
+    return _pools.get()
+
+
+def get_async_connection() -> aioredis.Redis:
+    if uses_memory_backend():
+        return AsyncMemoryRedis(get_memory_redis())  # type: ignore[return-value]
+
+    return aioredis.Redis(connection_pool=get_async_connection_pool())
+
+
+class AsyncCacheService:
+    """asyncio counterpart of `CacheService`.
+
+    Keys, encoding and L1 invalidation are shared with the sync service,
+    so both of them read and write the same entries.
+    """
+
+    def __init__(self, connection: aioredis.Redis | None = None):
+        self.connection: aioredis.Redis = connection or get_async_connection()
+        self._pipeline: aioredis.client.Pipeline | None = None
+        self.local: LocalCache = get_local_cache()
+        self.metrics: MetricsSink = get_metrics()
+
+    _build_key = staticmethod(CacheService._build_key)
+
+    async def _write(self, command: str, *args, **kwargs) -> None:
+        """Run a write command now, or queue it while `batch()` is active."""
+
+        if self._pipeline is not None:
+            getattr(self._pipeline, command)(*args, **kwargs)
+        else:
+            await getattr(self.connection, command)(*args, **kwargs)
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator["AsyncCacheService"]:
+        """Queue every write inside the block and flush them in one round trip."""
+
+        if self._pipeline is not None:
+            yield self
+            return
+
+        self._pipeline = self.connection.pipeline(transaction=False)
+        try:
+            yield self
+            await self._pipeline.execute()
+        finally:
+            await self._pipeline.reset()
+            self._pipeline = None
+
+    async def _invalidate(self, namespace: str, key: str) -> None:
+        if namespace not in self.local.namespaces:
+            return
+
+        self.local.invalidate(namespace, key)
+        await self._write("publish", INVALIDATION_CHANNEL, f"{_process_origin()}|{namespace}|{key}")
+
+    async def get_ttl(self, namespace: str, key: str) -> int:
+        return await self.connection.ttl(self._build_key(namespace, key))
+
+    async def set(self, namespace: str, key: str, value: dict, ttl: int | None = None):
+        started = time.perf_counter()
+        payload = get_serializer(namespace).encode(value)
+
+        await self._write("set", self._build_key(namespace, key), payload, ex=ttl)
+        await self._invalidate(namespace, key)
+
+        if self.metrics.enabled:
+            self.metrics.observe("cache.set_ms", (time.perf_counter() - started) * 1000, tags={"namespace": namespace})
+            self.metrics.observe("cache.value_bytes", len(payload), tags={"namespace": namespace, "operation": "set"})
+
+    async def get(self, namespace: str, key: str):
+        """Return the cached value or `None` when there is no such key."""
+
+        if self.local.enabled_for(namespace):
+            value = self.local.get(namespace, key)
+            record_read(self.metrics, namespace, "l1", None if value is MISSING else 0)
+            if value is not MISSING:
+                return value
+
+        started = time.perf_counter()
+        result: bytes | None = await self.connection.get(self._build_key(namespace, key))
+
+        if self.metrics.enabled:
+            self.metrics.observe("cache.get_ms", (time.perf_counter() - started) * 1000, tags={"namespace": namespace})
+        record_read(self.metrics, namespace, "l2", None if result is None else len(result))
+
+        if result is None:
+            return None
+
+        value = get_serializer(namespace).decode(result)
+        if self.local.enabled_for(namespace):
+            self.local.set(namespace, key, value)
+
+        return value
+
+    async def add(self, namespace: str, key: str, value: dict, ttl: int | None = None) -> bool:
+        payload = get_serializer(namespace).encode(value)
+
+        return bool(await self.connection.set(self._build_key(namespace, key), payload, ex=ttl, nx=True))
+
+    @asynccontextmanager
+    async def lock(self, name: str, ttl: float) -> AsyncIterator[bool]:
+        """Hold the `locks:<name>` key for at most `ttl` seconds. Yields whether it was acquired."""
+
+        lock = self.connection.lock(self._build_key("locks", name), timeout=ttl)
+        acquired = await lock.acquire(blocking=False)
+
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    await lock.release()
+                except redis.exceptions.LockNotOwnedError:
+                    print(f"Lock {name} expired before it was released")
+
+    async def increment(self, namespace: str, key: str, ttl: int | None = None) -> int:
+        pipeline = self.connection.pipeline(transaction=True)
+        pipeline.incr(self._build_key(namespace, key))
+        if ttl is not None:
+            pipeline.expire(self._build_key(namespace, key), ttl, nx=True)
+
+        return (await pipeline.execute())[0]
+
+    async def delete(self, namespace: str, key: str):
+        await self._write("delete", self._build_key(namespace, key))
+        await self._invalidate(namespace, key)
+
+    async def get_fields(self, namespace: str, key: str) -> dict[str, Any]:
+        result: dict[bytes, bytes] = await self.connection.hgetall(self._build_key(namespace, key))
+        record_read(self.metrics, namespace, "l2", sum(map(len, result.values())) if result else None)
+        serializer = get_serializer(namespace)
+
+        return {field.decode(): serializer.decode(value) for field, value in result.items()}
+
+    async def set_fields(
+        self,
+        namespace: str,
+        key: str,
+        mapping: dict[str, Any],
+        ttl: int | None = None,
+        replace: bool = False,
+    ):
+        key = self._build_key(namespace, key)
+        serializer = get_serializer(namespace)
+        pipeline = self._pipeline if self._pipeline is not None else self.connection.pipeline(transaction=True)
+
+        if replace:
+            pipeline.delete(key)
+        if mapping:
+            pipeline.hset(key, mapping={field: serializer.encode(value) for field, value in mapping.items()})
+        if ttl is not None:
+            pipeline.expire(key, ttl)
+
+        if pipeline is not self._pipeline:
+            await pipeline.execute()
+
+    async def delete_fields(self, namespace: str, key: str, fields: Iterable[str]):
+        fields = list(fields)
+        if fields:
+            await self._write("hdel", self._build_key(namespace, key), *fields)
+
+    async def add_members(
+        self,
+        namespace: str,
+        key: str,
+        members: Iterable[str],
+        ttl: int | None = None,
+        replace: bool = False,
+    ):
+        key = self._build_key(namespace, key)
+        members = list(members)
+
+        if replace:
+            await self._write("delete", key)
+        if members:
+            await self._write("sadd", key, *members)
+        if ttl is not None:
+            await self._write("expire", key, ttl)
+
+    async def remove_member(self, namespace: str, key: str, member: str, ttl: int | None = None) -> tuple[bool, int]:
+        pipeline = self.connection.pipeline(transaction=True)
+        pipeline.srem(self._build_key(namespace, key), member)
+        pipeline.scard(self._build_key(namespace, key))
+        if ttl is not None:
+            pipeline.expire(self._build_key(namespace, key), ttl)
+        removed, remaining, *_ = await pipeline.execute()
+
+        return bool(removed), remaining
+
+    async def append_event(self, namespace: str, key: str, value: Any, maxlen: int, ttl: int | None = None) -> None:
+        key = self._build_key(namespace, key)
+
+        await self._write(
+            "xadd", key, {"data": get_serializer(namespace).encode(value)}, maxlen=maxlen, approximate=True
+        )
+        if ttl is not None:
+            await self._write("expire", key, ttl)
+
+    async def last_event_id(self, namespace: str, key: str) -> str | None:
+        entries = await self.connection.xrevrange(self._build_key(namespace, key), count=1)
+
+        return entries[0][0].decode() if entries else None
+
+    async def read_events(
+        self,
+        namespace: str,
+        key: str,
+        last_id: str = "$",
+        block: int | None = None,
+        count: int | None = None,
+    ) -> list[tuple[str, Any]]:
+        result = await self.connection.xread({self._build_key(namespace, key): last_id}, count=count, block=block)
+
+        return decode_events(namespace, result)
+
+    async def read_streams(
+        self,
+        namespace: str,
+        last_ids: dict[str, str],
+        block: int | None = None,
+        count: int | None = None,
+    ) -> dict[str, list[tuple[str, Any]]]:
+        """`read_events` of several keys with a single XREAD, only keys with new events are returned."""
+
+        streams = {self._build_key(namespace, key): last_id for key, last_id in last_ids.items()}
+        result = await self.connection.xread(streams, count=count, block=block)  # type: ignore[arg-type]
+
+        return decode_streams(namespace, result)
+
+    async def get_many(self, keys: Iterable[CacheKey]) -> dict[CacheKey, Any]:
+        values, remote_keys = read_local_many(self.local, self.metrics, keys)
+        if not remote_keys:
+            return values
+
+        results = await self.connection.mget([self._build_key(namespace, key) for namespace, key in remote_keys])
+
+        return values | decode_remote_many(self.local, self.metrics, remote_keys, results)
+
+    async def set_many(self, items: dict[CacheKey, dict], ttl: int | None = None):
+        async with self.batch():
+            for (namespace, key), value in items.items():
+                await self.set(namespace, key, value, ttl=ttl)
+
+    async def delete_many(self, keys: Iterable[CacheKey]):
+        keys = list(keys)
+        if not keys:
+            return
+
+        async with self.batch():
+            await self._write("delete", *[self._build_key(namespace, key) for namespace, key in keys])
+
+            for namespace, key in keys:
+                await self._invalidate(namespace, key)
@@ -1,8 +1,21 @@
-import json
 import os
+import socket
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from dataclasses import dataclass
+from typing import Any
 
 import redis
+from django.conf import settings
+
+from shared.codecs import get_serializer
+from shared.local_cache import MISSING, LocalCache
+from shared.memory_redis import MemoryRedis
+from shared.metrics import MetricsSink, get_metrics
+from shared.process import ProcessLocal
 
 
 @dataclass
@@ -11,31 +24,501 @@ class Sctucture:
     name: str
 
 
+_memory_redis: MemoryRedis | None = None
+
+
+def _create_connection_pool() -> redis.ConnectionPool:
+    return redis.ConnectionPool.from_url(
+        settings.CACHE_REDIS_URL,
+        max_connections=settings.CACHE_REDIS_MAX_CONNECTIONS,
+        health_check_interval=settings.CACHE_REDIS_HEALTH_CHECK_INTERVAL,
+        socket_timeout=settings.CACHE_REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.CACHE_REDIS_SOCKET_TIMEOUT,
+    )
+
+
+_pool: ProcessLocal[redis.ConnectionPool] = ProcessLocal(_create_connection_pool)
+
+
+def get_connection_pool() -> redis.ConnectionPool:
+    """Return the process-wide Redis connection pool, created lazily and never shared with forked children."""
+
+    return _pool.get()
+
+
+def uses_memory_backend() -> bool:
+    return settings.CACHE_REDIS_URL.startswith("memory://")
+
+
+def get_memory_redis() -> MemoryRedis:
+    """The in-process stand-in used for `memory://`, shared by the sync and asyncio services."""
+
+    global _memory_redis
+
+    if _memory_redis is None:
+        _memory_redis = MemoryRedis()
+
+    return _memory_redis
+
+
+def get_connection() -> redis.Redis:
+    """Client of the configured backend: Redis through the shared pool, or the in-process stand-in for `memory://`."""
+
+    if uses_memory_backend():
+        return get_memory_redis()  # type: ignore[return-value]
+
+    return redis.Redis(connection_pool=get_connection_pool())
+
+
+def reset_connection_pool() -> None:
+    """Drop the current pool, the in-memory data and the L1 cache. The next `CacheService` starts fresh."""
+
+    global _memory_redis
+
+    pool = _pool.peek()
+    if pool is not None:
+        pool.disconnect()
+
+    _pool.reset()
+    _memory_redis = None
+    _local_cache.reset()
+
+
+def pool_stats() -> dict[str, int]:
+    """Connection usage of the current process pool, to spot saturation."""
+
+    pool = _pool.peek()
+
+    if pool is None:
+        return {"max_connections": settings.CACHE_REDIS_MAX_CONNECTIONS, "created": 0, "in_use": 0, "available": 0}
+
+    return {
+        "max_connections": pool.max_connections,
+        "created": pool._created_connections,
+        "in_use": len(pool._in_use_connections),
+        "available": len(pool._available_connections),
+    }
+
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+_remote_stats: Counter[str] = Counter()
+
+
+def _process_origin() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _listen_for_invalidations(local_cache: LocalCache) -> None:
+    """Drop L1 entries changed by other processes. Runs in a daemon thread."""
+
+    origin = _process_origin()
+
+    while _local_cache.peek() is local_cache:
+        try:
+            pubsub = get_connection().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            local_cache.active = True
+
+            while _local_cache.peek() is local_cache:
+                message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+
+                sender, namespace, key = message["data"].decode().split("|", 2)
+                if sender != origin:
+                    local_cache.invalidate(namespace, key)
+        except redis.RedisError as error:
+            # Invalidations could be missed while disconnected, so stop serving from L1
+            print(f"Cache invalidation listener is reconnecting: {error}")
+            local_cache.active = False
+            local_cache.clear()
+            time.sleep(1)
+        else:
+            pubsub.close()
+
+
+def _create_local_cache() -> LocalCache:
+    local_cache = LocalCache(settings.CACHE_LOCAL_NAMESPACES)
+
+    if settings.CACHE_LOCAL_NAMESPACES:
+        threading.Thread(target=_listen_for_invalidations, args=(local_cache,), daemon=True).start()
+
+    return local_cache
+
+
+_local_cache: ProcessLocal[LocalCache] = ProcessLocal(_create_local_cache)
+
+
+def get_local_cache() -> LocalCache:
+    """Return the process-wide L1 cache configured by `CACHE_LOCAL_NAMESPACES`."""
+
+    return _local_cache.get()
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    """Hit/miss counters of this process for the in-process (L1) and Redis (L2) tiers."""
+
+    local_cache = _local_cache.peek()
+    local_stats = local_cache.stats if local_cache is not None else Counter()
+
+    return {
+        "l1": {"hits": local_stats["hits"], "misses": local_stats["misses"]},
+        "l2": {"hits": _remote_stats["hits"], "misses": _remote_stats["misses"]},
+    }
+
+
+# (namespace, key) pair used by the multi-key operations
+CacheKey = tuple[str, str]
+
+
+def record_read(metrics: MetricsSink, namespace: str, tier: str, size: int | None) -> None:
+    """Count a hit (`size` is the value size in bytes) or a miss (`size` is `None`) of one cache tier."""
+
+    if tier == "l2":
+        _remote_stats["misses" if size is None else "hits"] += 1
+
+    if not metrics.enabled:
+        return
+
+    metrics.increment("cache.misses" if size is None else "cache.hits", tags={"namespace": namespace, "tier": tier})
+
+    if size:
+        metrics.observe("cache.value_bytes", size, tags={"namespace": namespace, "operation": "get"})
+
+
+def decode_events(namespace: str, result: list) -> list[tuple[str, Any]]:
+    """Turn an XREAD reply of one stream into `(entry id, value)` pairs."""
+
+    return next(iter(decode_streams(namespace, result).values()), [])
+
+
+def decode_streams(namespace: str, result: list) -> dict[str, list[tuple[str, Any]]]:
+    """Turn an XREAD reply of several streams into `(entry id, value)` pairs by key."""
+
+    serializer = get_serializer(namespace)
+    prefix = len(CacheService._build_key(namespace, ""))
+
+    return {
+        stream.decode()[prefix:]: [
+            (entry_id.decode(), serializer.decode(fields[b"data"])) for entry_id, fields in entries
+        ]
+        for stream, entries in result or []
+    }
+
+
+def read_local_many(
+    local: LocalCache, metrics: MetricsSink, keys: Iterable[CacheKey]
+) -> tuple[dict[CacheKey, Any], list[CacheKey]]:
+    """First half of `get_many`: the values served by L1 and the keys left for the MGET."""
+
+    values: dict[CacheKey, Any] = {}
+    remote_keys: list[CacheKey] = []
+
+    for namespace, key in keys:
+        if not local.enabled_for(namespace):
+            remote_keys.append((namespace, key))
+            continue
+
+        value = local.get(namespace, key)
+        record_read(metrics, namespace, "l1", None if value is MISSING else 0)
+
+        if value is MISSING:
+            remote_keys.append((namespace, key))
+        else:
+            values[(namespace, key)] = value
+
+    return values, remote_keys
+
+
+def decode_remote_many(
+    local: LocalCache, metrics: MetricsSink, keys: list[CacheKey], results: list[bytes | None]
+) -> dict[CacheKey, Any]:
+    """Second half of `get_many`: decode the MGET reply and keep the values in L1."""
+
+    values: dict[CacheKey, Any] = {}
+
+    for (namespace, key), result in zip(keys, results):
+        record_read(metrics, namespace, "l2", None if result is None else len(result))
+        values[(namespace, key)] = get_serializer(namespace).decode(result) if result is not None else None
+
+        if result is not None and local.enabled_for(namespace):
+            local.set(namespace, key, values[(namespace, key)])
+
+    return values
+
+
 class CacheService:
-    def __init__(self):
-        # self.connection: redis.Redis = redis.Redis.from_url(
-        #     os.getenv("DJANGO_CACHE_URL", default="redis://localhost:6379/0")
-        # )
-        self.connection: redis.Redis = redis.Redis.from_url("redis://localhost:6379/0")
+    def __init__(self, connection: redis.Redis | None = None):
+        self.connection: redis.Redis = connection or get_connection()
+        self._pipeline: redis.client.Pipeline | None = None
+        self.local: LocalCache = get_local_cache()
+        self.metrics: MetricsSink = get_metrics()
 
     @staticmethod
     def _build_key(namespace: str, key: str) -> str:
         return f"{namespace}:{key}"
 
+    @property
+    def _writer(self) -> redis.Redis | redis.client.Pipeline:
+        """Writes are queued into the pipeline while `batch()` is active."""
+
+        return self.connection if self._pipeline is None else self._pipeline
+
+    @contextmanager
+    def batch(self) -> Iterator["CacheService"]:
+        """Queue every `set`/`delete` inside the block and flush them in one round trip.
+
+        Reads are not queued and always hit Redis immediately.
+        Nothing is written if the block raises.
+        """
+
+        if self._pipeline is not None:
+            yield self
+            return
+
+        self._pipeline = self.connection.pipeline(transaction=False)
+        try:
+            yield self
+            self._pipeline.execute()
+        finally:
+            self._pipeline.reset()
+            self._pipeline = None
+
+    def _invalidate(self, namespace: str, key: str) -> None:
+        """Drop the L1 copy here and, through pub/sub, in every other process."""
+
+        if namespace not in self.local.namespaces:
+            return
+
+        self.local.invalidate(namespace, key)
+        self._writer.publish(INVALIDATION_CHANNEL, f"{_process_origin()}|{namespace}|{key}")
+
     def get_ttl(self, namespace: str, key: str) -> int:
         key = self._build_key(namespace, key)
 
         return self.connection.ttl(key)
 
     def set(self, namespace: str, key: str, value: dict, ttl: int | None = None):
-        key = self._build_key(namespace, key)
+        started = time.perf_counter()
+        payload = get_serializer(namespace).encode(value)
 
-        self.connection.set(key, value=json.dumps(value), ex=ttl)
+        self._writer.set(self._build_key(namespace, key), value=payload, ex=ttl)
+        self._invalidate(namespace, key)
+
+        if self.metrics.enabled:
+            self.metrics.observe("cache.set_ms", (time.perf_counter() - started) * 1000, tags={"namespace": namespace})
+            self.metrics.observe("cache.value_bytes", len(payload), tags={"namespace": namespace, "operation": "set"})
 
     def get(self, namespace: str, key: str):
-        result: str = self.connection.get(self._build_key(namespace, key))
+        """Return the cached value or `None` when there is no such key."""
+
+        if self.local.enabled_for(namespace):
+            value = self.local.get(namespace, key)
+            record_read(self.metrics, namespace, "l1", None if value is MISSING else 0)
+            if value is not MISSING:
+                return value
+
+        started = time.perf_counter()
+        result: bytes | None = self.connection.get(self._build_key(namespace, key))
+
+        if self.metrics.enabled:
+            self.metrics.observe("cache.get_ms", (time.perf_counter() - started) * 1000, tags={"namespace": namespace})
+        record_read(self.metrics, namespace, "l2", None if result is None else len(result))
+
+        if result is None:
+            return None
+
+        value = get_serializer(namespace).decode(result)
+        if self.local.enabled_for(namespace):
+            self.local.set(namespace, key, value)
+
+        return value
+
+    def add(self, namespace: str, key: str, value: dict, ttl: int | None = None) -> bool:
+        """Set the value only if the key does not exist yet (SET NX). Returns whether it was set."""
+
+        return bool(
+            self.connection.set(
+                self._build_key(namespace, key), get_serializer(namespace).encode(value), ex=ttl, nx=True
+            )
+        )
 
-        return json.loads(result)
+    @contextmanager
+    def lock(self, name: str, ttl: float) -> Iterator[bool]:
+        """Hold the `locks:<name>` key for at most `ttl` seconds. Yields whether it was acquired.
+
+        The key keeps a random token and is deleted only while it still holds it,
+        so a run that outlived `ttl` never releases the lock of the next holder.
+        """
+
+        lock = self.connection.lock(self._build_key("locks", name), timeout=ttl)
+        acquired = lock.acquire(blocking=False)
+
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except redis.exceptions.LockNotOwnedError:
+                    print(f"Lock {name} expired before it was released")
+
+    def increment(self, namespace: str, key: str, ttl: int | None = None) -> int:
+        """INCR a plain integer counter (not encoded by the namespace codec) and return the new value.
+
+        The `ttl` is set when the counter is created only, so it counts within a fixed window.
+        """
+
+        pipeline = self.connection.pipeline(transaction=True)
+        pipeline.incr(self._build_key(namespace, key))
+        if ttl is not None:
+            pipeline.expire(self._build_key(namespace, key), ttl, nx=True)
+
+        return pipeline.execute()[0]
 
     def delete(self, namespace: str, key: str):
-        self.connection.delete(self._build_key(namespace, key))
+        self._writer.delete(self._build_key(namespace, key))
+        self._invalidate(namespace, key)
+
+    def get_fields(self, namespace: str, key: str) -> dict[str, Any]:
+        """Read every field of a hash. Missing keys give an empty dict."""
+
+        started = time.perf_counter()
+        result: dict[bytes, bytes] = self.connection.hgetall(self._build_key(namespace, key))
+
+        if self.metrics.enabled:
+            self.metrics.observe("cache.get_ms", (time.perf_counter() - started) * 1000, tags={"namespace": namespace})
+        record_read(self.metrics, namespace, "l2", sum(map(len, result.values())) if result else None)
+
+        serializer = get_serializer(namespace)
+
+        return {field.decode(): serializer.decode(value) for field, value in result.items()}
+
+    def set_fields(
+        self,
+        namespace: str,
+        key: str,
+        mapping: dict[str, Any],
+        ttl: int | None = None,
+        replace: bool = False,
+    ):
+        """Update only the given hash fields in one atomic MULTI/EXEC block.
+
+        With `replace=True` all other fields are dropped first.
+        """
+
+        started = time.perf_counter()
+        key = self._build_key(namespace, key)
+        serializer = get_serializer(namespace)
+        pipeline = self._pipeline if self._pipeline is not None else self.connection.pipeline(transaction=True)
+        fields = {field: serializer.encode(value) for field, value in mapping.items()}
+
+        if replace:
+            pipeline.delete(key)
+        if fields:
+            pipeline.hset(key, mapping=fields)
+        if ttl is not None:
+            pipeline.expire(key, ttl)
+
+        if pipeline is not self._pipeline:
+            pipeline.execute()
+
+        if self.metrics.enabled:
+            tags = {"namespace": namespace}
+            self.metrics.observe("cache.set_ms", (time.perf_counter() - started) * 1000, tags=tags)
+            self.metrics.observe("cache.value_bytes", sum(map(len, fields.values())), tags=tags | {"operation": "set"})
+
+    def delete_fields(self, namespace: str, key: str, fields: Iterable[str]):
+        fields = list(fields)
+        if fields:
+            self._writer.hdel(self._build_key(namespace, key), *fields)
+
+    def add_members(
+        self, namespace: str, key: str, members: Iterable[str], ttl: int | None = None, replace: bool = False
+    ):
+        """SADD to a Redis set. With `replace=True` the other members are dropped first."""
+
+        key = self._build_key(namespace, key)
+        members = list(members)
+
+        if replace:
+            self._writer.delete(key)
+        if members:
+            self._writer.sadd(key, *members)
+        if ttl is not None:
+            self._writer.expire(key, ttl)
+
+    def remove_member(self, namespace: str, key: str, member: str, ttl: int | None = None) -> tuple[bool, int]:
+        """SREM and SCARD in one MULTI/EXEC: whether the member was removed by this call and how many are left.
+
+        With `ttl` the expiration of the remaining members is refreshed in the same transaction.
+        """
+
+        pipeline = self.connection.pipeline(transaction=True)
+        pipeline.srem(self._build_key(namespace, key), member)
+        pipeline.scard(self._build_key(namespace, key))
+        if ttl is not None:
+            pipeline.expire(self._build_key(namespace, key), ttl)
+        removed, remaining, *_ = pipeline.execute()
+
+        return bool(removed), remaining
+
+    def append_event(self, namespace: str, key: str, value: Any, maxlen: int, ttl: int | None = None) -> None:
+        """XADD the value to a stream capped (approximately) at `maxlen` entries."""
+
+        key = self._build_key(namespace, key)
+
+        self._writer.xadd(key, {"data": get_serializer(namespace).encode(value)}, maxlen=maxlen, approximate=True)
+        if ttl is not None:
+            self._writer.expire(key, ttl)
+
+    def last_event_id(self, namespace: str, key: str) -> str | None:
+        entries = self.connection.xrevrange(self._build_key(namespace, key), count=1)
+
+        return entries[0][0].decode() if entries else None
+
+    def read_events(
+        self,
+        namespace: str,
+        key: str,
+        last_id: str = "$",
+        block: int | None = None,
+        count: int | None = None,
+    ) -> list[tuple[str, Any]]:
+        """Stream entries after `last_id` as `(entry id, value)`, waiting up to `block` milliseconds for new ones."""
+
+        result = self.connection.xread({self._build_key(namespace, key): last_id}, count=count, block=block)
+
+        return decode_events(namespace, result)
+
+    def get_many(self, keys: Iterable[CacheKey]) -> dict[CacheKey, Any]:
+        """Fetch values from any namespaces with a single MGET. Missing keys map to `None`."""
+
+        values, remote_keys = read_local_many(self.local, self.metrics, keys)
+        if not remote_keys:
+            return values
+
+        started = time.perf_counter()
+        results = self.connection.mget([self._build_key(namespace, key) for namespace, key in remote_keys])
+
+        if self.metrics.enabled:
+            self.metrics.observe("cache.get_many_ms", (time.perf_counter() - started) * 1000)
+
+        return values | decode_remote_many(self.local, self.metrics, remote_keys, results)
+
+    def set_many(self, items: dict[CacheKey, dict], ttl: int | None = None):
+        with self.batch():
+            for (namespace, key), value in items.items():
+                self.set(namespace, key, value, ttl=ttl)
+
+    def delete_many(self, keys: Iterable[CacheKey]):
+        keys = list(keys)
+        if not keys:
+            return
+
+        with self.batch():
+            self._writer.delete(*[self._build_key(namespace, key) for namespace, key in keys])
+
+            for namespace, key in keys:
+                self._invalidate(namespace, key)
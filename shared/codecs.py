@@ -0,0 +1,97 @@
+import json
+import zlib
+from functools import lru_cache
+from typing import Any
+
+import orjson
+from django.conf import settings
+
+# JSON text never starts with a NUL byte, so values written before codecs
+# existed (plain `json.dumps`) are told apart from the framed ones.
+MAGIC = b"\x00"
+FORMAT_VERSION = 1
+FLAG_COMPRESSED = 0b0000_0001
+
+
+class Codec:
+    id: int
+    name: str
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    id = 1
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """Same wire format as `JsonCodec`, so either side can decode the other."""
+
+    id = 2
+    name = "orjson"
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+CODECS: dict[str, Codec] = {codec.name: codec for codec in (JsonCodec(), OrjsonCodec())}
+CODECS_BY_ID: dict[int, Codec] = {codec.id: codec for codec in CODECS.values()}
+
+
+class Serializer:
+    """Encode values as `MAGIC | version | codec id | flags | payload`.
+
+    The payload is zlib-compressed when it is bigger than `compress_threshold` bytes.
+    """
+
+    def __init__(self, codec: Codec, compress_threshold: int | None = None):
+        self.codec = codec
+        self.compress_threshold = compress_threshold
+
+    def encode(self, value: Any) -> bytes:
+        payload = self.codec.dumps(value)
+        flags = 0
+
+        if self.compress_threshold is not None and len(payload) > self.compress_threshold:
+            payload = zlib.compress(payload)
+            flags |= FLAG_COMPRESSED
+
+        return MAGIC + bytes((FORMAT_VERSION, self.codec.id, flags)) + payload
+
+    @staticmethod
+    def decode(data: bytes) -> Any:
+        if not data.startswith(MAGIC):
+            return json.loads(data)
+
+        version, codec_id, flags = data[1], data[2], data[3]
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported cache format version: {version}")
+
+        payload = data[4:]
+        if flags & FLAG_COMPRESSED:
+            payload = zlib.decompress(payload)
+
+        return CODECS_BY_ID[codec_id].loads(payload)
+
+
+@lru_cache
+def get_serializer(namespace: str) -> Serializer:
+    """Serializer configured for the namespace in `CACHE_NAMESPACE_CODECS`."""
+
+    config = settings.CACHE_NAMESPACE_CODECS.get(namespace, settings.CACHE_DEFAULT_CODEC)
+
+    return Serializer(CODECS[config["codec"]], config.get("compress_threshold"))
@@ -0,0 +1,67 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any
+
+MISSING = object()
+
+
+class LocalCache:
+    """Bounded in-process LRU that sits in front of Redis.
+
+    Only namespaces listed in `namespaces` are cached, each one with
+    its own TTL (seconds) and maximum number of entries, e.g.
+    `{"recommendations": {"ttl": 60, "max_size": 1000}}`.
+    """
+
+    def __init__(self, namespaces: dict[str, dict[str, int]]):
+        self.namespaces = namespaces
+        self.stats: Counter[str] = Counter()
+        # Set by the invalidation listener while it is subscribed
+        self.active = False
+        self._entries: dict[str, OrderedDict[str, tuple[float, Any]]] = {name: OrderedDict() for name in namespaces}
+        self._lock = threading.Lock()
+
+    def enabled_for(self, namespace: str) -> bool:
+        return self.active and namespace in self._entries
+
+    def get(self, namespace: str, key: str) -> Any:
+        """Return the cached value or `MISSING`."""
+
+        entries = self._entries[namespace]
+
+        with self._lock:
+            item = entries.get(key)
+
+            if item is None or item[0] < time.monotonic():
+                entries.pop(key, None)
+                self.stats["misses"] += 1
+                return MISSING
+
+            entries.move_to_end(key)
+            self.stats["hits"] += 1
+
+            return item[1]
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        config = self.namespaces[namespace]
+        entries = self._entries[namespace]
+
+        with self._lock:
+            entries[key] = (time.monotonic() + config["ttl"], value)
+            entries.move_to_end(key)
+
+            while len(entries) > config["max_size"]:
+                entries.popitem(last=False)
+
+    def invalidate(self, namespace: str, key: str) -> None:
+        if namespace not in self._entries:
+            return
+
+        with self._lock:
+            self._entries[namespace].pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            for entries in self._entries.values():
+                entries.clear()
@@ -0,0 +1,422 @@
+"""In-process stand-in for the subset of Redis that `CacheService` uses.
+
+Selected with `DJANGO_CACHE_URL=memory://`. Data lives in the current
+process only, which is enough for hermetic tests and for comparing cache
+overhead against a real server. Keys expire like in Redis, pipelines are
+applied atomically and pub/sub is delivered to every subscriber of the process.
+"""
+
+import asyncio
+import math
+import queue
+import threading
+import time
+import uuid
+from typing import Any
+
+from redis.exceptions import LockNotOwnedError
+
+
+def _to_bytes(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode()
+    if isinstance(value, (int, float)):
+        return str(value).encode()
+
+    raise TypeError(f"Invalid input of type {type(value).__name__}")
+
+
+class MemoryServer:
+    def __init__(self):
+        self.lock = threading.RLock()
+        # Notified on every stream write, for blocking XREAD
+        self.stream_added = threading.Condition(self.lock)
+        self.data: dict[bytes, Any] = {}
+        self.expires: dict[bytes, float] = {}
+        self.channels: dict[bytes, list[queue.Queue]] = {}
+
+    def alive(self, key: bytes) -> bool:
+        deadline = self.expires.get(key)
+
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+
+        return key in self.data
+
+    def flush(self) -> None:
+        with self.lock:
+            self.data.clear()
+            self.expires.clear()
+
+
+class MemoryRedis:
+    def __init__(self, server: MemoryServer | None = None):
+        self.server = server or MemoryServer()
+
+    def _get(self, key: Any, default: Any = None) -> Any:
+        key = _to_bytes(key)
+
+        return self.server.data[key] if self.server.alive(key) else default
+
+    # Strings
+
+    def get(self, name: Any) -> bytes | None:
+        with self.server.lock:
+            return self._get(name)
+
+    def mget(self, keys: list[Any]) -> list[bytes | None]:
+        with self.server.lock:
+            return [self._get(key) for key in keys]
+
+    def set(self, name: Any, value: Any, ex: int | None = None, nx: bool = False) -> bool | None:
+        key = _to_bytes(name)
+
+        with self.server.lock:
+            if nx and self.server.alive(key):
+                return None
+
+            self.server.data[key] = _to_bytes(value)
+            self.server.expires.pop(key, None)
+            if ex is not None:
+                self.server.expires[key] = time.monotonic() + ex
+
+            return True
+
+    # Keys
+
+    def delete(self, *names: Any) -> int:
+        deleted = 0
+
+        with self.server.lock:
+            for name in names:
+                key = _to_bytes(name)
+                if self.server.alive(key):
+                    del self.server.data[key]
+                    self.server.expires.pop(key, None)
+                    deleted += 1
+
+        return deleted
+
+    def exists(self, *names: Any) -> int:
+        with self.server.lock:
+            return sum(self.server.alive(_to_bytes(name)) for name in names)
+
+    def expire(self, name: Any, time_: int, nx: bool = False) -> bool:
+        key = _to_bytes(name)
+
+        with self.server.lock:
+            if not self.server.alive(key) or (nx and key in self.server.expires):
+                return False
+
+            self.server.expires[key] = time.monotonic() + time_
+
+            return True
+
+    def ttl(self, name: Any) -> int:
+        key = _to_bytes(name)
+
+        with self.server.lock:
+            if not self.server.alive(key):
+                return -2
+            if key not in self.server.expires:
+                return -1
+
+            return math.ceil(self.server.expires[key] - time.monotonic())
+
+    def incr(self, name: Any, amount: int = 1) -> int:
+        key = _to_bytes(name)
+
+        with self.server.lock:
+            value = int(self._get(key, 0)) + amount
+            self.server.data[key] = _to_bytes(value)
+
+            return value
+
+    # Hashes
+
+    def hset(self, name: Any, key: Any = None, value: Any = None, mapping: dict | None = None) -> int:
+        items = dict(mapping or {})
+        if key is not None:
+            items[key] = value
+
+        with self.server.lock:
+            hash_ = self._get(name)
+            if hash_ is None:
+                hash_ = self.server.data[_to_bytes(name)] = {}
+
+            added = 0
+            for field, field_value in items.items():
+                field = _to_bytes(field)
+                added += field not in hash_
+                hash_[field] = _to_bytes(field_value)
+
+            return added
+
+    def hdel(self, name: Any, *fields: Any) -> int:
+        with self.server.lock:
+            hash_ = self._get(name, {})
+            deleted = sum(hash_.pop(_to_bytes(field), None) is not None for field in fields)
+
+            if not hash_:
+                self.delete(name)
+
+            return deleted
+
+    def hgetall(self, name: Any) -> dict[bytes, bytes]:
+        with self.server.lock:
+            return dict(self._get(name, {}))
+
+    # Sets
+
+    def sadd(self, name: Any, *values: Any) -> int:
+        with self.server.lock:
+            set_ = self._get(name)
+            if set_ is None:
+                set_ = self.server.data[_to_bytes(name)] = set()
+
+            added = {_to_bytes(value) for value in values} - set_
+            set_ |= added
+
+            return len(added)
+
+    def srem(self, name: Any, *values: Any) -> int:
+        with self.server.lock:
+            set_ = self._get(name, set())
+            removed = {_to_bytes(value) for value in values} & set_
+            set_ -= removed
+
+            if not set_:
+                self.delete(name)
+
+            return len(removed)
+
+    def scard(self, name: Any) -> int:
+        with self.server.lock:
+            return len(self._get(name, set()))
+
+    # Streams
+
+    @staticmethod
+    def _stream_id(entry_id: bytes) -> tuple[int, int]:
+        milliseconds, _, sequence = entry_id.partition(b"-")
+
+        return int(milliseconds), int(sequence or 0)
+
+    def _read_from(self, name: Any, entry_id: Any) -> tuple[int, int]:
+        """Stream ID to read after. "$" means only the entries added after the call."""
+
+        if _to_bytes(entry_id) != b"$":
+            return self._stream_id(_to_bytes(entry_id))
+
+        stream = self._get(name, [])
+
+        return self._stream_id(stream[-1][0]) if stream else (0, 0)
+
+    def xadd(self, name: Any, fields: dict, maxlen: int | None = None, approximate: bool = True) -> bytes:
+        with self.server.lock:
+            stream = self._get(name)
+            if stream is None:
+                stream = self.server.data[_to_bytes(name)] = []
+
+            milliseconds, sequence = int(time.time() * 1000), 0
+            if stream:
+                last = self._stream_id(stream[-1][0])
+                milliseconds, sequence = (last[0], last[1] + 1) if last[0] >= milliseconds else (milliseconds, 0)
+
+            entry_id = f"{milliseconds}-{sequence}".encode()
+            stream.append((entry_id, {_to_bytes(field): _to_bytes(value) for field, value in fields.items()}))
+
+            if maxlen is not None:
+                del stream[:-maxlen]
+
+            self.server.stream_added.notify_all()
+
+            return entry_id
+
+    def xrevrange(self, name: Any, max: Any = "+", min: Any = "-", count: int | None = None) -> list:
+        with self.server.lock:
+            entries = list(reversed(self._get(name, [])))
+
+        return entries[:count] if count else entries
+
+    def xread(self, streams: dict, count: int | None = None, block: int | None = None) -> list:
+        deadline = time.monotonic() + block / 1000 if block else None
+
+        with self.server.lock:
+            last_ids = {_to_bytes(name): self._read_from(name, entry_id) for name, entry_id in streams.items()}
+
+            while True:
+                result = []
+                for name, last_id in last_ids.items():
+                    entries = [entry for entry in self._get(name, []) if self._stream_id(entry[0]) > last_id]
+                    if entries:
+                        result.append([name, entries[:count] if count else entries])
+
+                remaining = deadline - time.monotonic() if deadline is not None else 0
+                if result or remaining <= 0:
+                    return result
+
+                self.server.stream_added.wait(remaining)
+
+    # Locks
+
+    def lock(self, name: Any, timeout: float | None = None, **kwargs) -> "MemoryLock":
+        return MemoryLock(self, name, timeout)
+
+    # Pub/Sub
+
+    def publish(self, channel: Any, message: Any) -> int:
+        channel = _to_bytes(channel)
+        payload = {"type": "message", "pattern": None, "channel": channel, "data": _to_bytes(message)}
+
+        with self.server.lock:
+            subscribers = list(self.server.channels.get(channel, ()))
+
+        for subscriber in subscribers:
+            subscriber.put(payload)
+
+        return len(subscribers)
+
+    def pubsub(self, **kwargs) -> "MemoryPubSub":
+        return MemoryPubSub(self.server)
+
+    # Pipelines
+
+    def pipeline(self, transaction: bool = True) -> "MemoryPipeline":
+        return MemoryPipeline(self)
+
+    def flushdb(self) -> bool:
+        self.server.flush()
+
+        return True
+
+
+class MemoryPipeline:
+    """Queues commands and applies them under the server lock, like MULTI/EXEC."""
+
+    def __init__(self, client: MemoryRedis):
+        self.client = client
+        self.commands: list[tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, command: str):
+        if not hasattr(self.client, command):
+            raise AttributeError(command)
+
+        def queue_command(*args, **kwargs) -> "MemoryPipeline":
+            self.commands.append((command, args, kwargs))
+            return self
+
+        return queue_command
+
+    def execute(self) -> list[Any]:
+        commands, self.commands = self.commands, []
+
+        with self.client.server.lock:
+            return [getattr(self.client, command)(*args, **kwargs) for command, args, kwargs in commands]
+
+    def reset(self) -> None:
+        self.commands = []
+
+    def __enter__(self) -> "MemoryPipeline":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.reset()
+
+
+class MemoryLock:
+    """Token lock with the `redis.lock.Lock` semantics: only the holder of the token deletes the key."""
+
+    def __init__(self, client: MemoryRedis, name: Any, timeout: float | None = None):
+        self.client = client
+        self.name = name
+        self.timeout = timeout
+        self.token: bytes | None = None
+
+    def acquire(self, blocking: bool | None = None) -> bool:
+        token = uuid.uuid4().hex.encode()
+
+        if self.client.set(self.name, token, ex=self.timeout, nx=True):  # type: ignore[arg-type]
+            self.token = token
+            return True
+
+        return False
+
+    def release(self) -> None:
+        token, self.token = self.token, None
+
+        with self.client.server.lock:
+            if token is None or self.client.get(self.name) != token:
+                raise LockNotOwnedError("Cannot release a lock that's no longer owned")
+
+            self.client.delete(self.name)
+
+
+class MemoryPubSub:
+    def __init__(self, server: MemoryServer):
+        self.server = server
+        self.messages: queue.Queue = queue.Queue()
+        self.channels: set[bytes] = set()
+
+    def subscribe(self, *channels: Any) -> None:
+        with self.server.lock:
+            for channel in map(_to_bytes, channels):
+                self.channels.add(channel)
+                self.server.channels.setdefault(channel, []).append(self.messages)
+
+    def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> dict | None:
+        try:
+            return self.messages.get(timeout=timeout) if timeout else self.messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        with self.server.lock:
+            for channel in self.channels:
+                self.server.channels[channel].remove(self.messages)
+
+        self.channels.clear()
+
+
+class AsyncMemoryRedis:
+    """`redis.asyncio` flavour of `MemoryRedis` sharing the same data."""
+
+    def __init__(self, client: MemoryRedis):
+        self.client = client
+
+    def __getattr__(self, command: str):
+        method = getattr(self.client, command)
+
+        async def run_command(*args, **kwargs):
+            if kwargs.get("block"):
+                # Blocking reads wait on a thread, not on the event loop
+                return await asyncio.to_thread(method, *args, **kwargs)
+
+            return method(*args, **kwargs)
+
+        return run_command
+
+    def pipeline(self, transaction: bool = True) -> "AsyncMemoryPipeline":
+        return AsyncMemoryPipeline(self.client)
+
+    def lock(self, name: Any, timeout: float | None = None, **kwargs) -> "AsyncMemoryLock":
+        return AsyncMemoryLock(self.client, name, timeout)
+
+
+class AsyncMemoryLock(MemoryLock):
+    async def acquire(self, blocking: bool | None = None) -> bool:  # type: ignore[override]
+        return super().acquire(blocking)
+
+    async def release(self) -> None:  # type: ignore[override]
+        super().release()
+
+
+class AsyncMemoryPipeline(MemoryPipeline):
+    async def execute(self) -> list[Any]:  # type: ignore[override]
+        return super().execute()
+
+    async def reset(self) -> None:  # type: ignore[override]
+        super().reset()
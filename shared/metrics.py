@@ -0,0 +1,131 @@
+import math
+import os
+import threading
+from collections import defaultdict
+from typing import Any
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from shared.process import ProcessLocal
+
+Tags = dict[str, str] | None
+
+
+class MetricsSink:
+    """Destination for application metrics. Subclass it to ship them elsewhere (StatsD, Prometheus, ...)."""
+
+    enabled = True
+
+    def increment(self, name: str, value: int = 1, tags: Tags = None) -> None:
+        raise NotImplementedError
+
+    def observe(self, name: str, value: float, tags: Tags = None) -> None:
+        """Record one sample of a histogram (latency, payload size, ...)."""
+
+        raise NotImplementedError
+
+    def snapshot(self) -> dict[str, Any]:
+        return {}
+
+
+class NullMetrics(MetricsSink):
+    enabled = False
+
+    def increment(self, name: str, value: int = 1, tags: Tags = None) -> None:
+        pass
+
+    def observe(self, name: str, value: float, tags: Tags = None) -> None:
+        pass
+
+
+class Histogram:
+    """Power-of-two buckets: cheap to update, percentiles are accurate within a factor of two."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.buckets: dict[int, int] = defaultdict(int)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.buckets[math.ceil(math.log2(value)) if value > 0 else -64] += 1
+
+    def percentile(self, percent: float) -> float:
+        rank = self.count * percent / 100
+        seen = 0
+
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(2.0**bucket, self.max)
+
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+
+class InMemoryMetrics(MetricsSink):
+    """Default sink: aggregates counters and histograms inside the current process."""
+
+    def __init__(self):
+        self.counters: dict[tuple, int] = defaultdict(int)
+        self.histograms: dict[tuple, Histogram] = defaultdict(Histogram)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, tags: Tags) -> tuple:
+        return (name, *sorted(tags.items())) if tags else (name,)
+
+    def increment(self, name: str, value: int = 1, tags: Tags = None) -> None:
+        key = self._key(name, tags)
+
+        with self._lock:
+            self.counters[key] += value
+
+    def observe(self, name: str, value: float, tags: Tags = None) -> None:
+        key = self._key(name, tags)
+
+        with self._lock:
+            self.histograms[key].observe(value)
+
+    @staticmethod
+    def _format(key: tuple) -> str:
+        name, *tags = key
+
+        return f"{name}{{{','.join(f'{tag}={value}' for tag, value in tags)}}}" if tags else name
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "counters": {self._format(key): value for key, value in self.counters.items()},
+                "histograms": {self._format(key): histogram.summary() for key, histogram in self.histograms.items()},
+            }
+
+
+_metrics: ProcessLocal[MetricsSink] = ProcessLocal(lambda: import_string(settings.METRICS_SINK)())
+
+
+def get_metrics() -> MetricsSink:
+    """Process-wide sink configured by `METRICS_SINK`."""
+
+    return _metrics.get()
+
+
+def reset_metrics() -> None:
+    _metrics.reset()
@@ -0,0 +1,100 @@
+"""Per-process singletons that survive `fork()`.
+
+Connection pools, HTTP clients and metrics must never be shared between a
+parent and its forked children (Celery prefork, gunicorn workers): sockets
+inherited from the parent would be used by two processes at once. A
+`ProcessLocal` value is created lazily by the process that uses it and is
+dropped in the child right after the fork.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from collections.abc import Callable
+from typing import Generic, TypeVar, cast
+
+T = TypeVar("T")
+
+_instances: "weakref.WeakSet[ProcessLocal]" = weakref.WeakSet()
+
+
+class ProcessLocal(Generic[T]):
+    """Value built by `factory` on first use in every process, e.g.
+
+    _pool = ProcessLocal(lambda: redis.ConnectionPool.from_url(settings.CACHE_REDIS_URL))
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._value: T | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+        _instances.add(self)
+
+    def get(self) -> T:
+        """Return the value of the current process, creating it if needed."""
+
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._value = self.factory()
+                    self._pid = os.getpid()
+
+        return cast(T, self._value)
+
+    def peek(self) -> T | None:
+        """The value of the current process or `None` if it was not created yet."""
+
+        return self._value if self._pid == os.getpid() else None
+
+    def reset(self) -> None:
+        """Drop the value. The next `get` creates a new one."""
+
+        self._value, self._pid = None, None
+
+    def _forget(self) -> None:
+        self.reset()
+        # The lock could be held by a thread that does not exist in the child
+        self._lock = threading.Lock()
+
+
+class LoopLocal(Generic[T]):
+    """`ProcessLocal` flavour with one value per asyncio event loop.
+
+    asyncio connections are bound to the event loop that opened them,
+    so every loop of the process gets its own pool or client.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self.factory = factory
+        self._values: ProcessLocal[weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]] = ProcessLocal(
+            weakref.WeakKeyDictionary
+        )
+
+    def get(self) -> T:
+        """Return the value of the running event loop, creating it if needed."""
+
+        values = self._values.get()
+        loop = asyncio.get_running_loop()
+        value = values.get(loop)
+
+        if value is None:
+            value = values[loop] = self.factory()
+
+        return value
+
+    def pop(self) -> T | None:
+        """Forget the value of the running event loop and return it, e.g. to close it."""
+
+        values = self._values.peek()
+
+        return values.pop(asyncio.get_running_loop(), None) if values is not None else None
+
+
+def _forget_after_fork() -> None:
+    for instance in list(_instances):
+        instance._forget()
+
+
+os.register_at_fork(after_in_child=_forget_after_fork)
@@ -0,0 +1,132 @@
+"""Fan-out of Redis streams to many asyncio subscribers.
+
+A blocking XREAD holds its connection for the whole wait. Instead of one
+XREAD (and one pooled connection) per open event stream, every event loop
+runs a single reader per namespace that waits on the streams of all its
+subscribers at once and hands the entries out.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator, Iterable
+from contextlib import asynccontextmanager
+from typing import Any
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from shared.async_cache import AsyncCacheService
+from shared.process import LoopLocal
+
+Event = tuple[str, Any]
+
+
+def parse_stream_id(entry_id: str) -> tuple[int, ...]:
+    """`"1700000000000-1"` as `(1700000000000, 1)`, so entry ids compare in stream order."""
+
+    return tuple(int(part) for part in entry_id.split("-"))
+
+
+class Subscription:
+    """Entries of one stream for one subscriber, in order and without duplicates."""
+
+    def __init__(self, last_id: str):
+        self.last_id = last_id
+        self.queue: asyncio.Queue[Event] = asyncio.Queue()
+        # Entries of the reader are held back until the subscriber caught up with the stream
+        self._pending: list[Event] | None = []
+
+    def put(self, events: Iterable[Event]) -> None:
+        if self._pending is not None:
+            self._pending.extend(events)
+            return
+
+        for entry_id, value in events:
+            if parse_stream_id(entry_id) > parse_stream_id(self.last_id):
+                self.last_id = entry_id
+                self.queue.put_nowait((entry_id, value))
+
+    def catch_up(self, events: list[Event]) -> None:
+        """Queue the entries missed before subscribing, then the ones the reader handed out meanwhile."""
+
+        pending, self._pending = self._pending or [], None
+        self.put(events)
+        self.put(pending)
+
+    async def get(self, timeout: float) -> Event | None:
+        """The next entry or `None` if there was none within `timeout` seconds."""
+
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class StreamFanout:
+    """One XREAD of the `namespace` streams for all subscribers of the event loop."""
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self.cache = AsyncCacheService()
+        self._cursors: dict[str, str] = {}
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._reader: asyncio.Task | None = None
+
+    @asynccontextmanager
+    async def subscribe(self, key: str, last_id: str) -> AsyncIterator[Subscription]:
+        """Entries of the `key` stream after `last_id` until the block exits."""
+
+        subscription = Subscription(last_id)
+        self._subscribers.setdefault(key, set()).add(subscription)
+        self._cursors.setdefault(key, last_id)
+
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+        try:
+            subscription.catch_up(await self.cache.read_events(self.namespace, key, last_id))
+            yield subscription
+        finally:
+            self._unsubscribe(key, subscription)
+
+    def _unsubscribe(self, key: str, subscription: Subscription) -> None:
+        subscribers = self._subscribers[key]
+        subscribers.discard(subscription)
+
+        if not subscribers:
+            del self._subscribers[key], self._cursors[key]
+
+        if not self._subscribers and self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+
+    async def _read(self) -> None:
+        block = int(settings.CACHE_STREAM_READ_BLOCK * 1000)
+
+        while self._subscribers:
+            try:
+                streams = await self.cache.read_streams(self.namespace, dict(self._cursors), block=block)
+            except RedisError as error:
+                print(f"Reading the {self.namespace} streams failed: {error}")
+                await asyncio.sleep(1)
+                continue
+
+            for key, events in streams.items():
+                if key not in self._cursors:
+                    continue
+
+                self._cursors[key] = events[-1][0]
+                for subscription in self._subscribers[key]:
+                    subscription.put(events)
+
+
+_fanouts: LoopLocal[dict[str, StreamFanout]] = LoopLocal(dict)
+
+
+def get_stream_fanout(namespace: str) -> StreamFanout:
+    """Return the fan-out of the `namespace` streams for the running event loop."""
+
+    fanouts = _fanouts.get()
+    if namespace not in fanouts:
+        fanouts[namespace] = StreamFanout(namespace)
+
+    return fanouts[namespace]
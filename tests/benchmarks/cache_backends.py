@@ -0,0 +1,69 @@
+"""Compare `CacheService` overhead on the in-memory backend and on a real Redis.
+
+Run with: python -m tests.benchmarks.cache_backends [redis://host:port/db]
+"""
+
+import os
+import sys
+import timeit
+
+import django
+import redis
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cateringproject.settings")
+os.environ.setdefault("DJANGO_SECRET_KEY", "benchmark")
+django.setup()
+
+from django.test import override_settings  # noqa: E402
+
+from food.enums import OrderStatus  # noqa: E402
+from food.tracking import TrackingOrder, TrackingStore  # noqa: E402
+from shared.cache import CacheService, reset_connection_pool  # noqa: E402
+
+NUMBER = 5_000
+
+
+def measure(url: str) -> dict[str, float] | None:
+    with override_settings(CACHE_REDIS_URL=url, CACHE_LOCAL_NAMESPACES={}):
+        reset_connection_pool()
+        cache = CacheService()
+
+        try:
+            cache.set("benchmark", "warmup", {"value": 1})
+        except redis.RedisError as error:
+            print(f"Skipping {url}: {error}")
+            return None
+
+        tracking = TrackingStore(cache)
+        tracking.create(1, TrackingOrder(restaurants={"1": {"external_id": None, "status": OrderStatus.NOT_STARTED}}))
+        keys = [("benchmark", str(index)) for index in range(10)]
+        cache.set_many({key: {"value": 1} for key in keys})
+
+        operations = {
+            "set": lambda: cache.set("benchmark", "key", {"value": 1}, ttl=60),
+            "get": lambda: cache.get("benchmark", "key"),
+            "get_many (10 keys)": lambda: cache.get_many(keys),
+            "tracking update": lambda: tracking.update_restaurant(1, 1, status=OrderStatus.COOKING),
+            "tracking read": lambda: tracking.get(1),
+        }
+        results = {
+            name: timeit.timeit(operation, number=NUMBER) / NUMBER * 1_000_000 for name, operation in operations.items()
+        }
+
+        cache.delete_many(keys + [("benchmark", "key"), ("benchmark", "warmup"), ("orders", "1")])
+        reset_connection_pool()
+
+        return results
+
+
+def run(redis_url: str):
+    backends = {"memory://": measure("memory://"), redis_url: measure(redis_url)}
+    backends = {url: results for url, results in backends.items() if results is not None}
+
+    print(f"{'operation, us':<22}" + "".join(f"{url:>30}" for url in backends))
+    for operation in next(iter(backends.values())):
+        print(f"{operation:<22}" + "".join(f"{results[operation]:>30.2f}" for results in backends.values()))
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else "redis://localhost:6379/0")
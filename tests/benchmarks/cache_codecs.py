@@ -0,0 +1,89 @@
+"""Compare cache codecs on real payloads: encode/decode time and bytes stored.
+
+Run with: python -m tests.benchmarks.cache_codecs
+"""
+
+import json
+import os
+import timeit
+from dataclasses import asdict
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cateringproject.settings")
+os.environ.setdefault("DJANGO_SECRET_KEY", "benchmark")
+django.setup()
+
+from food.enums import OrderStatus  # noqa: E402
+from food.models import Dish  # noqa: E402
+from food.serializers import DishSerializer  # noqa: E402
+from food.tracking import TrackingOrder  # noqa: E402
+from shared.codecs import CODECS, Serializer  # noqa: E402
+
+NUMBER = 20_000
+
+
+class LegacyJson:
+    """What `CacheService` stored before codecs existed."""
+
+    @staticmethod
+    def encode(value):
+        return json.dumps(value).encode()
+
+    @staticmethod
+    def decode(data):
+        return json.loads(data)
+
+
+def tracking_order_payload() -> dict:
+    tracking_order = TrackingOrder(
+        restaurants={
+            "1": {"external_id": "0b5a7d3e-3c4f-4c2a-9b8e-3f2f9a6b1c11", "status": OrderStatus.COOKED},
+            "2": {"external_id": "5f1c2b9a-8d7e-4e6f-a1b2-c3d4e5f6a7b8", "status": OrderStatus.COOKING},
+        },
+        delivery={"status": OrderStatus.DELIVERY, "location": [0.4362871, 0.9182736]},
+    )
+
+    return asdict(tracking_order)
+
+
+def dishes_payload(total: int) -> dict:
+    dishes = [
+        Dish(id=dish_id, name=f"Dish number {dish_id}", price=100 + dish_id, restaurant_id=dish_id % 3 + 1)
+        for dish_id in range(1, total + 1)
+    ]
+
+    return {"dishes": json.loads(json.dumps(DishSerializer(dishes, many=True).data))}
+
+
+def run():
+    payloads = {
+        "TrackingOrder": tracking_order_payload(),
+        "recommendations (2 dishes)": dishes_payload(2),
+        "recommendations (50 dishes)": dishes_payload(50),
+    }
+    serializers = {
+        "legacy json.dumps": LegacyJson,
+        "json": Serializer(CODECS["json"]),
+        "orjson": Serializer(CODECS["orjson"]),
+        "json + zlib": Serializer(CODECS["json"], compress_threshold=0),
+        "orjson + zlib": Serializer(CODECS["orjson"], compress_threshold=0),
+    }
+
+    print(f"{'payload':<30}{'codec':<20}{'bytes':>8}{'encode, us':>14}{'decode, us':>14}")
+
+    for payload_name, payload in payloads.items():
+        for serializer_name, serializer in serializers.items():
+            encoded = serializer.encode(payload)
+            assert serializer.decode(encoded) == json.loads(json.dumps(payload))
+
+            encode = timeit.timeit(lambda: serializer.encode(payload), number=NUMBER) / NUMBER * 1_000_000
+            decode = timeit.timeit(lambda: serializer.decode(encoded), number=NUMBER) / NUMBER * 1_000_000
+
+            print(f"{payload_name:<30}{serializer_name:<20}{len(encoded):>8}{encode:>14.2f}{decode:>14.2f}")
+
+        print()
+
+
+if __name__ == "__main__":
+    run()
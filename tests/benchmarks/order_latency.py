@@ -0,0 +1,105 @@
+"""Latency of POST /food/orders with restaurants dispatched through Celery and inline.
+
+Provider HTTP calls are replaced with a sleep of the injected latency, so no mock servers are needed.
+Run with: python -m tests.benchmarks.order_latency [latency ms ...]
+"""
+
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from unittest import mock
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cateringproject.settings")
+os.environ.setdefault("DJANGO_SECRET_KEY", "benchmark")
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+from rest_framework_simplejwt.tokens import AccessToken  # noqa: E402
+
+from cateringproject import celery_app  # noqa: E402
+from food.models import Dish, Restaurant  # noqa: E402
+from food.providers import kfc, silpo  # noqa: E402
+from shared.cache import reset_connection_pool  # noqa: E402
+from users.models import User  # noqa: E402
+
+REQUESTS = 100
+WARMUP = 5
+
+
+def fake_provider(module, latency: float):
+    def create_order(order):
+        time.sleep(latency)
+        return module.OrderResponse(id="benchmark", status=module.OrderStatus.NOT_STARTED)
+
+    return create_order
+
+
+def measure(client: APIClient, body: dict, latency: float, inline: bool) -> dict[str, float]:
+    durations = []
+
+    with (
+        mock.patch.object(kfc.Client, "create_order", fake_provider(kfc, latency)),
+        mock.patch.object(silpo.Client, "create_order", fake_provider(silpo, latency)),
+    ):
+        # Eager tasks run inside the request, like `schedule_order` did before it became a task
+        celery_app.conf.task_always_eager = inline
+
+        for request in range(WARMUP + REQUESTS):
+            started = time.perf_counter()
+            response = client.post("/food/orders/", data=body, format="json")
+
+            assert response.status_code == 201, response.content
+            if request >= WARMUP:
+                durations.append((time.perf_counter() - started) * 1000)
+
+        celery_app.conf.task_always_eager = False
+
+    percentiles = statistics.quantiles(durations, n=100)
+
+    return {"p50": percentiles[49], "p99": percentiles[98]}
+
+
+def run(latencies: list[float]):
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    celery_app.conf.update(CELERY_BROKER_URL="memory://")
+
+    with override_settings(CACHE_REDIS_URL="memory://"):
+        reset_connection_pool()
+
+        user = User.objects.create_user(email="john@email.com", password="password", phone_number="+3809611")
+        user.is_active = True
+        user.save()
+
+        dishes = [
+            Dish.objects.create(name=f"{name} dish", price=100, restaurant=Restaurant.objects.create(name=name))
+            for name in ("Silpo", "KFC")
+        ]
+        body = {
+            "eta": (date.today() + timedelta(days=2)).isoformat(),
+            "delivery_provider": "uklon",
+            "user": user.pk,
+            "items": [{"dish": dish.pk, "quantity": 1} for dish in dishes],
+        }
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+
+        print(f"{'dispatch':<10}{'latency, ms':>14}{'p50, ms':>12}{'p99, ms':>12}")
+        for inline in (False, True):
+            for latency in latencies:
+                results = measure(client, body, latency / 1000, inline)
+                dispatch = "inline" if inline else "celery"
+                print(f"{dispatch:<10}{latency:>14g}{results['p50']:>12.2f}{results['p99']:>12.2f}")
+
+        reset_connection_pool()
+
+
+if __name__ == "__main__":
+    run([float(latency) for latency in sys.argv[1:]] or [0, 50])
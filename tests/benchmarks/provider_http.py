@@ -0,0 +1,75 @@
+"""Per-call latency of the mock providers with a new connection per call and with the keep-alive client.
+
+The mocks from `tests/providers` are started in-process with uvicorn.
+Run with: python -m tests.benchmarks.provider_http
+"""
+
+import os
+import statistics
+import threading
+import time
+
+import django
+import httpx
+import uvicorn
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cateringproject.settings")
+os.environ.setdefault("DJANGO_SECRET_KEY", "benchmark")
+django.setup()
+
+from food.providers.http import close_http_clients, get_http_client  # noqa: E402
+from tests.providers import kfc, silpo, uklon  # noqa: E402
+
+NUMBER = 500
+PROVIDERS = {
+    "kfc": (kfc.app, 18002, "/api/orders/benchmark"),
+    "silpo": (silpo.app, 18001, "/api/orders/benchmark"),
+    "uklon": (uklon.app, 18003, "/drivers/orders/benchmark"),
+}
+
+
+def start_server(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="error", access_log=False))
+    threading.Thread(target=server.run, daemon=True).start()
+
+    while not server.started:
+        time.sleep(0.01)
+
+    return server
+
+
+def measure(call) -> dict[str, float]:
+    durations = []
+
+    for _ in range(NUMBER):
+        started = time.perf_counter()
+        call().raise_for_status()
+        durations.append((time.perf_counter() - started) * 1000)
+
+    percentiles = statistics.quantiles(durations, n=100)
+
+    return {"p50": percentiles[49], "p99": percentiles[98]}
+
+
+def run():
+    servers = [start_server(app, port) for app, port, _ in PROVIDERS.values()]
+
+    print(f"{'provider':<10}{'client':<14}{'p50, ms':>12}{'p99, ms':>12}")
+    for provider, (_, port, path) in PROVIDERS.items():
+        url = f"http://127.0.0.1:{port}{path}"
+        clients = {
+            "httpx.get": lambda: httpx.get(url),
+            "keep-alive": lambda: get_http_client(provider).get(url),
+        }
+
+        for name, call in clients.items():
+            results = measure(call)
+            print(f"{provider:<10}{name:<14}{results['p50']:>12.3f}{results['p99']:>12.3f}")
+
+    close_http_clients()
+    for server in servers:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    run()
@@ -1,17 +1,40 @@
 import pytest
 
+from cateringproject import celery_app
+from food.registry import reset_providers
+from shared.cache import reset_connection_pool
 from users.models import User
 
+from .factories import create_user
+
+
+@pytest.fixture(autouse=True, scope="session")
+def memory_broker():
+    """Queue Celery tasks in memory instead of RabbitMQ. No worker consumes them."""
+
+    # Settings are loaded with the CELERY namespace, so the prefixed key is the one in effect
+    celery_app.conf.update(CELERY_BROKER_URL="memory://")
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(settings):
+    """Run `CacheService` against the in-process Redis stand-in, empty for every test."""
+
+    settings.CACHE_REDIS_URL = "memory://"
+    reset_connection_pool()
+    yield
+    reset_connection_pool()
+
+
+@pytest.fixture(autouse=True)
+def provider_registry():
+    """Restaurants are created per test, so the reference data and the registry are loaded again by every test."""
+
+    reset_providers()
+    yield
+    reset_providers()
+
 
 @pytest.fixture
-def john(django_user_model) -> User:
-    user = django_user_model.objects.create_user(
-        email="john@email.com",
-        password="password",
-        phone_number="+3809611",
-        first_name="John",
-        last_name="Doe",
-        is_active=True,
-    )
-
-    return user
+def john(db) -> User:
+    return create_user()
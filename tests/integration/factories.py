@@ -0,0 +1,60 @@
+from collections.abc import Iterable
+from datetime import date
+
+import httpx
+
+from food.enums import OrderStatus
+from food.models import Order
+from food.tracking import TrackingOrder, TrackingStore
+from users.models import User
+
+JOHN = {
+    "email": "john@email.com",
+    "password": "password",
+    "phone_number": "+3809611",
+    "first_name": "John",
+    "last_name": "Doe",
+}
+
+
+def create_user(**fields) -> User:
+    """The `john` fixture user, for `TestCase` classes that cannot request fixtures."""
+
+    return User.objects.create_user(**(JOHN | fields))
+
+
+def create_orders(user: User, count: int = 1, **fields) -> list[Order]:
+    return [Order.objects.create(user=user, eta=date.today(), **fields) for _ in range(count)]
+
+
+def status_error(status_code: int) -> httpx.HTTPStatusError:
+    """What `raise_for_status()` raises for a provider answer with `status_code`."""
+
+    request = httpx.Request("POST", "https://provider.example/api/orders")
+
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status_code, request=request))
+
+
+def track_order(
+    order_id: int,
+    restaurant_ids: Iterable[int] = (),
+    *,
+    status: OrderStatus = OrderStatus.NOT_STARTED,
+    external_id: str | None = None,
+    delivery: dict | None = None,
+    tracking: TrackingStore | None = None,
+) -> TrackingStore:
+    """Create the tracking of the order, every restaurant with the same `status` and `external_id`."""
+
+    tracking = tracking or TrackingStore()
+    tracking.create(
+        order_id,
+        TrackingOrder(
+            restaurants={
+                str(restaurant_id): {"external_id": external_id, "status": status} for restaurant_id in restaurant_ids
+            },
+            delivery=delivery or {},
+        ),
+    )
+
+    return tracking
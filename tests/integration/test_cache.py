@@ -0,0 +1,308 @@
+import asyncio
+import os
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from shared import process
+from shared.async_cache import AsyncCacheService
+from shared.cache import CacheService, get_connection_pool, pool_stats, reset_connection_pool
+from shared.codecs import CODECS, MAGIC, Serializer
+from shared.local_cache import MISSING, LocalCache
+from shared.memory_redis import MemoryRedis
+from shared.streams import get_stream_fanout
+
+
+class CacheConnectionPoolTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        # Pools are created lazily, no Redis server is needed here
+        self.redis_settings = self.settings(CACHE_REDIS_URL="redis://localhost:6379/0")
+        self.redis_settings.enable()
+        reset_connection_pool()
+
+    def tearDown(self) -> None:
+        reset_connection_pool()
+        self.redis_settings.disable()
+
+    def test_services_share_one_pool(self):
+        first = CacheService()
+        second = CacheService()
+
+        assert first.connection.connection_pool is second.connection.connection_pool
+        assert first.connection.connection_pool is get_connection_pool()
+
+    def test_pool_is_rebuilt_in_forked_process(self):
+        parent_pool = get_connection_pool()
+
+        with patch.object(process.os, "getpid", return_value=os.getpid() + 1):
+            child_pool = get_connection_pool()
+
+        assert child_pool is not parent_pool
+
+    def test_pool_is_dropped_after_fork(self):
+        parent_pool = get_connection_pool()
+
+        process._forget_after_fork()
+
+        assert pool_stats()["created"] == 0
+        assert get_connection_pool() is not parent_pool
+
+    def test_pool_stats(self):
+        get_connection_pool()
+        stats = pool_stats()
+
+        assert stats["max_connections"] > 0
+        assert stats["in_use"] == 0
+        assert stats["created"] == stats["in_use"] + stats["available"]
+
+
+class LocalCacheTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.local = LocalCache({"recommendations": {"ttl": 60, "max_size": 2}})
+        self.local.active = True
+
+    def test_only_configured_namespaces_are_cached(self):
+        assert self.local.enabled_for("recommendations")
+        assert not self.local.enabled_for("orders")
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.local.set("recommendations", "1", {"dishes": [1]})
+        self.local.set("recommendations", "2", {"dishes": [2]})
+        self.local.get("recommendations", "1")
+        self.local.set("recommendations", "3", {"dishes": [3]})
+
+        assert self.local.get("recommendations", "1") == {"dishes": [1]}
+        assert self.local.get("recommendations", "2") is MISSING
+        assert self.local.stats == {"hits": 2, "misses": 1}
+
+    def test_expired_entry_is_a_miss(self):
+        self.local.set("recommendations", "1", {"dishes": [1]})
+
+        with patch("shared.local_cache.time.monotonic", return_value=time.monotonic() + 61):
+            assert self.local.get("recommendations", "1") is MISSING
+
+    def test_disabled_while_invalidations_are_not_received(self):
+        self.local.active = False
+
+        assert not self.local.enabled_for("recommendations")
+
+
+class SerializerTestCase(SimpleTestCase):
+    def test_values_written_before_codecs_still_decode(self):
+        assert Serializer.decode(b'{"user_id": 1}') == {"user_id": 1}
+
+    def test_roundtrip_for_every_codec(self):
+        value = {"dishes": [{"id": 1, "name": "Dish 1", "price": 100, "restaurant": 1}]}
+
+        for codec in CODECS.values():
+            encoded = Serializer(codec).encode(value)
+
+            assert encoded.startswith(MAGIC)
+            assert Serializer.decode(encoded) == value
+
+    def test_large_payloads_are_compressed(self):
+        value = {"dishes": [{"id": dish_id, "name": "Dish"} for dish_id in range(100)]}
+        plain = Serializer(CODECS["json"]).encode(value)
+        compressed = Serializer(CODECS["json"], compress_threshold=256).encode(value)
+
+        assert len(compressed) < len(plain)
+        assert Serializer.decode(compressed) == value
+
+
+class MemoryBackendTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.cache = CacheService()
+
+    def test_uses_in_memory_backend(self):
+        assert isinstance(self.cache.connection, MemoryRedis)
+
+    def test_get_set_delete(self):
+        self.cache.set("activation", "key", {"user_id": 1})
+
+        assert self.cache.get("activation", "key") == {"user_id": 1}
+        assert self.cache.get("activation", "missing") is None
+
+        self.cache.delete("activation", "key")
+
+        assert self.cache.get("activation", "key") is None
+
+    def test_ttl(self):
+        self.cache.set("activation", "key", {"user_id": 1}, ttl=50)
+
+        assert self.cache.get_ttl("activation", "key") == 50
+        assert self.cache.get_ttl("activation", "missing") == -2
+
+        with patch("shared.memory_redis.time.monotonic", return_value=time.monotonic() + 51):
+            assert self.cache.get("activation", "key") is None
+
+    def test_batch_is_flushed_on_exit(self):
+        with self.cache.batch():
+            self.cache.set("orders", "1", {"status": "cooking"})
+            self.cache.set("kfc_orders", "abc", {"internal_order_id": 1})
+
+            assert self.cache.get("orders", "1") is None
+
+        assert self.cache.get_many([("orders", "1"), ("kfc_orders", "abc"), ("orders", "2")]) == {
+            ("orders", "1"): {"status": "cooking"},
+            ("kfc_orders", "abc"): {"internal_order_id": 1},
+            ("orders", "2"): None,
+        }
+
+    def test_batch_is_dropped_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.cache.batch():
+                self.cache.set("orders", "1", {"status": "cooking"})
+                raise RuntimeError
+
+        assert self.cache.get("orders", "1") is None
+
+    def test_counter_window_does_not_slide(self):
+        assert self.cache.increment("counters", "failures", ttl=60) == 1
+        self.cache.connection.expire("counters:failures", 5)
+
+        assert self.cache.increment("counters", "failures", ttl=60) == 2
+        assert self.cache.get_ttl("counters", "failures") <= 5
+
+    def test_lock_is_released_only_by_its_owner(self):
+        with self.cache.lock("job", ttl=60) as acquired:
+            assert acquired
+
+            with self.cache.lock("job", ttl=60) as acquired_again:
+                assert not acquired_again
+
+            # The lock expires and the next run takes it
+            self.cache.delete("locks", "job")
+            assert self.cache.add("locks", "job", {}, ttl=60)
+
+        assert self.cache.get("locks", "job") == {}
+
+        self.cache.delete("locks", "job")
+
+        with self.cache.lock("job", ttl=60) as acquired:
+            assert acquired
+
+        assert self.cache.get("locks", "job") is None
+
+    def test_pubsub(self):
+        pubsub = self.cache.connection.pubsub()
+        pubsub.subscribe("channel")
+
+        assert self.cache.connection.publish("channel", "message") == 1
+        assert pubsub.get_message(timeout=1)["data"] == b"message"
+        assert pubsub.get_message() is None
+
+
+class AsyncCacheServiceTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.cache = CacheService()
+
+    def test_reads_and_writes_sync_entries(self):
+        self.cache.set("orders", "1", {"status": "cooking"})
+
+        async def read_and_write():
+            async_cache = AsyncCacheService()
+            await async_cache.set_many({("orders", "2"): {"status": "cooked"}})
+
+            return await async_cache.get("orders", "1")
+
+        assert asyncio.run(read_and_write()) == {"status": "cooking"}
+        assert self.cache.get("orders", "2") == {"status": "cooked"}
+
+    def test_batch_is_flushed_on_exit(self):
+        async def write():
+            async_cache = AsyncCacheService()
+
+            async with async_cache.batch():
+                await async_cache.set("orders", "1", {"status": "cooking"})
+                await async_cache.set_fields("polling", "silpo", {"1.1": {"status": "cooking"}})
+
+                assert await async_cache.get("orders", "1") is None
+
+        asyncio.run(write())
+
+        assert self.cache.get("orders", "1") == {"status": "cooking"}
+        assert self.cache.get_fields("polling", "silpo") == {"1.1": {"status": "cooking"}}
+
+    def test_get_many_is_served_from_local_cache(self):
+        self.cache.local.active = True
+        self.cache.set_many({("recommendations", "1"): {"dishes": [1]}, ("orders", "1"): {"status": "cooking"}})
+
+        async def read():
+            return await AsyncCacheService().get_many([("recommendations", "1"), ("orders", "1"), ("orders", "2")])
+
+        # The first read fills L1, the second one only asks Redis for the other namespaces
+        assert asyncio.run(read()) == asyncio.run(read())
+
+        with patch.object(self.cache.connection, "mget", wraps=self.cache.connection.mget) as mget:
+            values = asyncio.run(read())
+
+        mget.assert_called_once_with(["orders:1", "orders:2"])
+        assert values == {
+            ("recommendations", "1"): {"dishes": [1]},
+            ("orders", "1"): {"status": "cooking"},
+            ("orders", "2"): None,
+        }
+        assert self.cache.local.stats["hits"] >= 1
+
+    def test_counters_sets_and_locks(self):
+        self.cache.add_members("pending_restaurants", "1", ["1", "2"])
+
+        async def write():
+            async_cache = AsyncCacheService()
+
+            async with async_cache.lock("job", ttl=60) as acquired:
+                async with async_cache.lock("job", ttl=60) as acquired_again:
+                    pass
+
+            counters = [await async_cache.increment("counters", "1", ttl=60) for _ in range(2)]
+            removed = await async_cache.remove_member("pending_restaurants", "1", "1", ttl=60)
+
+            return acquired, acquired_again, counters, removed
+
+        assert asyncio.run(write()) == (True, False, [1, 2], (True, 1))
+        assert self.cache.get("locks", "job") is None
+        assert 0 < self.cache.get_ttl("pending_restaurants", "1") <= 60
+
+    def test_read_events(self):
+        self.cache.append_event("order_events", "1", {"status": "cooking"}, maxlen=10)
+
+        async def read():
+            async_cache = AsyncCacheService()
+            events = await async_cache.read_events("order_events", "1", "0")
+            await async_cache.append_event("order_events", "1", {"status": "cooked"}, maxlen=10)
+
+            return events, await async_cache.read_events("order_events", "1", events[-1][0], block=100)
+
+        (first,), (second,) = asyncio.run(read())
+
+        assert first[1] == {"status": "cooking"}
+        assert second[1] == {"status": "cooked"}
+        assert second[0] > first[0]
+
+
+@override_settings(CACHE_STREAM_READ_BLOCK=0.1)
+class StreamFanoutTestCase(SimpleTestCase):
+    def test_subscribers_share_one_reader(self):
+        CacheService().append_event("order_events", "1", {"status": "cooking"}, maxlen=10)
+
+        async def subscribe():
+            fanout = get_stream_fanout("order_events")
+
+            with patch.object(fanout.cache, "read_streams", wraps=fanout.cache.read_streams) as read_streams:
+                async with (
+                    fanout.subscribe("1", "0") as first,
+                    fanout.subscribe("2", "0") as second,
+                    fanout.subscribe("2", "0") as third,
+                ):
+                    await fanout.cache.append_event("order_events", "2", {"status": "cooked"}, maxlen=10)
+                    events = [await subscription.get(timeout=1) for subscription in (first, second, third)]
+
+            return events, [call.args[1] for call in read_streams.call_args_list], fanout._reader
+
+        events, cursors, reader = asyncio.run(subscribe())
+
+        assert [value for _, value in events] == [{"status": "cooking"}, {"status": "cooked"}, {"status": "cooked"}]
+        # A single XREAD waits on the streams of all the subscribers
+        assert {"1", "2"} in [set(last_ids) for last_ids in cursors]
+        assert reader is None
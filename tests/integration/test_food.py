@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -77,6 +79,65 @@ class FoodTestCase(TestCase):
         assert total_restaurants == 2
         assert total_dishes == 4
 
+    def test_get_dishes_in_constant_number_of_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("food-dishes-list"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(5):
+                restaurant = Restaurant.objects.create(name=f"Restaurant {index}", address="1 Side St")
+                for dish in range(3):
+                    Dish.objects.create(restaurant=restaurant, name=f"Dish {index}.{dish}", price=100)
+
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(reverse("food-dishes-list"))
+
+        assert len(response.json()) == 7
+        assert all(len(restaurant["dishes"]) == 2 for restaurant in response.json())
+
+    def test_get_dishes_search_and_offset(self):
+        Dish.objects.create(restaurant=self.rest1, name="Soup", price=50)
+
+        response = self.client.get(reverse("food-dishes-list"), {"offset": 1})
+        dishes = {restaurant["id"]: [dish["name"] for dish in restaurant["dishes"]] for restaurant in response.json()}
+
+        assert dishes == {self.rest1.id: ["Dish 2", "Soup"], self.rest2.id: ["Dish 4"]}
+
+        response = self.client.get(reverse("food-dishes-list"), {"limit": 1})
+        dishes = {restaurant["id"]: [dish["name"] for dish in restaurant["dishes"]] for restaurant in response.json()}
+
+        assert dishes == {self.rest1.id: ["Dish 1"], self.rest2.id: ["Dish 3"]}
+
+        response = self.client.get(reverse("food-dishes-list"), {"search": "dish 1"})
+        dishes = {restaurant["id"]: [dish["name"] for dish in restaurant["dishes"]] for restaurant in response.json()}
+
+        assert dishes == {self.rest1.id: ["Dish 1"], self.rest2.id: []}
+
+    def test_get_dishes_etag(self):
+        response = self.client.get(reverse("food-dishes-list"), {"offset": 1})
+        etag = response.headers["ETag"]
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(reverse("food-dishes-list"), {"offset": 1}, HTTP_IF_NONE_MATCH=etag)
+
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        assert cached.headers["ETag"] == etag
+        assert self.client.get(reverse("food-dishes-list"), {"offset": 1}).json() == response.json()
+        assert self.client.get(reverse("food-dishes-list")).headers["ETag"] != etag
+        # Every page size is a listing of its own
+        limited = self.client.get(reverse("food-dishes-list"), {"limit": 1})
+        assert [len(restaurant["dishes"]) for restaurant in limited.json()] == [1] * len(limited.json())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dish2.price = 300
+            self.dish2.save()
+
+        changed = self.client.get(reverse("food-dishes-list"), {"offset": 1}, HTTP_IF_NONE_MATCH=etag)
+
+        assert changed.status_code == status.HTTP_200_OK
+        assert changed.headers["ETag"] != etag
+        assert changed.json()[0]["dishes"][0]["price"] == 300
+
     def test_create_dish_admin(self):
         request_body = {"name": "McTasty", "price": 11, "restaurant": 1}
 
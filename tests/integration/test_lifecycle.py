@@ -0,0 +1,37 @@
+from django.test import TestCase
+
+from food.enums import OrderStatus
+from food.lifecycle import can_transition, transition, transition_many
+
+from .factories import create_orders, create_user
+
+
+class LifecycleTestCase(TestCase):
+    def setUp(self) -> None:
+        self.orders = create_orders(create_user(), count=2)
+        self.order = self.orders[0]
+
+    def test_allowed_transition(self):
+        assert transition(self.order.pk, OrderStatus.COOKING)
+        assert transition(self.order.pk, OrderStatus.COOKED)
+
+        self.order.refresh_from_db()
+        assert self.order.status == OrderStatus.COOKED
+
+    def test_duplicate_transition_is_rejected(self):
+        assert transition(self.order.pk, OrderStatus.COOKED)
+        assert not transition(self.order.pk, OrderStatus.COOKED)
+
+    def test_invalid_transition_is_rejected(self):
+        with self.assertNumQueries(1):
+            assert not transition(self.order.pk, OrderStatus.DELIVERED)
+
+        self.order.refresh_from_db()
+        assert self.order.status == OrderStatus.NOT_STARTED
+        assert not can_transition(OrderStatus.DELIVERED, OrderStatus.COOKING)
+
+    def test_transition_many_skips_orders_in_other_states(self):
+        transition(self.order.pk, OrderStatus.FAILED)
+
+        with self.assertNumQueries(1):
+            assert transition_many([order.pk for order in self.orders], OrderStatus.COOKING) == 1
@@ -0,0 +1,52 @@
+from django.test import SimpleTestCase
+
+from shared.cache import CacheService
+from shared.metrics import Histogram, InMemoryMetrics, get_metrics, reset_metrics
+
+
+class InMemoryMetricsTestCase(SimpleTestCase):
+    def test_counters_and_histograms(self):
+        metrics = InMemoryMetrics()
+
+        metrics.increment("cache.hits", tags={"namespace": "orders"})
+        metrics.increment("cache.hits", tags={"namespace": "orders"})
+        for value in (1, 2, 3, 100):
+            metrics.observe("cache.get_ms", value)
+
+        snapshot = metrics.snapshot()
+
+        assert snapshot["counters"] == {"cache.hits{namespace=orders}": 2}
+        assert snapshot["histograms"]["cache.get_ms"]["count"] == 4
+        assert snapshot["histograms"]["cache.get_ms"]["max"] == 100
+
+    def test_histogram_percentiles_are_bucketed(self):
+        histogram = Histogram()
+
+        for value in range(1, 101):
+            histogram.observe(value)
+
+        assert 50 <= histogram.percentile(50) <= 64
+        assert histogram.percentile(99) == 100
+
+
+class CacheInstrumentationTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        reset_metrics()
+        self.cache = CacheService()
+
+    def tearDown(self) -> None:
+        reset_metrics()
+
+    def test_hits_misses_and_sizes_per_namespace(self):
+        self.cache.set("activation", "key", {"user_id": 1})
+        self.cache.get("activation", "key")
+        self.cache.get("activation", "missing")
+        self.cache.get_many([("kfc_orders", "abc")])
+
+        snapshot = get_metrics().snapshot()
+
+        assert snapshot["counters"]["cache.hits{namespace=activation,tier=l2}"] == 1
+        assert snapshot["counters"]["cache.misses{namespace=activation,tier=l2}"] == 1
+        assert snapshot["counters"]["cache.misses{namespace=kfc_orders,tier=l2}"] == 1
+        assert snapshot["histograms"]["cache.get_ms{namespace=activation}"]["count"] == 2
+        assert snapshot["histograms"]["cache.value_bytes{namespace=activation,operation=set}"]["count"] == 1
@@ -1,13 +1,22 @@
 from datetime import datetime, timedelta
+from unittest import mock
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from redis.exceptions import RedisError
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from food import services
+from food.enums import OrderStatus
 from food.models import Dish, Order, OrderItem, Restaurant
+from food.reference import bump_version, get_reference_data
+from food.registry import reset_providers
+from food.tracking import TrackingStore
 
 User = get_user_model()
 
@@ -97,6 +106,146 @@ class OrderTestCase(TestCase):
 
         assert len(order_items) == 2
 
+    def test_create_order_unknown_dish(self):
+        request_body = {
+            "eta": order_day_calculate(),
+            "delivery_provider": "uklon",
+            "user": self.john.id,
+            "items": [{"dish": self.dish1.id, "quantity": 2}, {"dish": 9999, "quantity": 1}],
+        }
+
+        response = self.client.post(reverse("food-orders"), data=request_body, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "dish" in response.json()["items"][1]
+        assert Order.objects.count() == 0
+
+    def test_create_order_unsupported_restaurant(self):
+        bulba = Restaurant.objects.create(name="Bulba", address="1 Side St")
+        dish = Dish.objects.create(restaurant=bulba, name="Draniki", price=90)
+        request_body = {
+            "eta": order_day_calculate(),
+            "delivery_provider": "uklon",
+            "items": [{"dish": self.dish1.id, "quantity": 2}, {"dish": dish.id, "quantity": 1}],
+        }
+
+        response = self.client.post(reverse("food-orders"), data=request_body, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "dish" in response.json()["items"][1]
+        assert Order.objects.count() == 0
+
+    def test_create_order_dispatches_restaurants_after_commit(self):
+        request_body = {
+            "eta": order_day_calculate(),
+            "delivery_provider": "uklon",
+            "user": self.john.id,
+            "items": [{"dish": self.dish1.id, "quantity": 2}, {"dish": self.dish3.id, "quantity": 1}],
+        }
+
+        with (
+            mock.patch.object(services.schedule_order, "delay") as schedule_order,
+            self.captureOnCommitCallbacks(execute=True) as callbacks,
+        ):
+            response = self.client.post(reverse("food-orders"), data=request_body, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED, response.json()
+        assert len(callbacks) == 1
+        schedule_order.assert_called_once_with(response.json()["id"])
+
+    def post_bulk(self, count: int):
+        orders = [
+            {"eta": order_day_calculate(), "delivery_provider": "uklon", "items": [{"dish": dish.id, "quantity": 1}]}
+            for dish in (self.dish1, self.dish3, self.dish4)[:count]
+        ]
+
+        with (
+            mock.patch.object(services.schedule_orders, "delay") as schedule_orders,
+            self.captureOnCommitCallbacks(execute=True),
+            CaptureQueriesContext(connection) as queries,
+        ):
+            response = self.client.post(reverse("food-orders-bulk"), data=orders, format="json")
+
+        return response, schedule_orders, len(queries)
+
+    def test_create_orders_bulk(self):
+        get_reference_data()
+        _, _, single_queries = self.post_bulk(1)
+        response, schedule_orders, bulk_queries = self.post_bulk(3)
+        orders = response.json()
+
+        assert response.status_code == status.HTTP_201_CREATED, orders
+        assert bulk_queries == single_queries
+        assert [order["total"] for order in orders] == [100, 200, 250]
+        assert [order["items"] for order in orders][1] == [{"dish": self.dish3.id, "quantity": 1}]
+        assert all(order["user"] == self.john.id for order in orders)
+        schedule_orders.assert_called_once_with([order["id"] for order in orders])
+
+    def test_create_orders_bulk_is_validated_as_a_whole(self):
+        orders = [
+            {
+                "eta": order_day_calculate(),
+                "delivery_provider": "uklon",
+                "items": [{"dish": self.dish1.id, "quantity": 1}],
+            },
+            {"eta": order_day_calculate(), "delivery_provider": "uklon", "items": [{"dish": 9999, "quantity": 1}]},
+        ]
+
+        response = self.client.post(reverse("food-orders-bulk"), data=orders, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Order.objects.count() == 0
+
+        with self.settings(ORDERS_BULK_MAX_SIZE=1):
+            response = self.client.post(reverse("food-orders-bulk"), data=orders[:1] * 2, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_schedule_order_places_all_restaurants_in_one_group(self):
+        order = Order.objects.create(user=self.john, eta=order_day_calculate())
+        OrderItem.objects.create(order=order, dish=self.dish1, quantity=1)
+        OrderItem.objects.create(order=order, dish=self.dish3, quantity=1)
+
+        with mock.patch.object(services, "group") as group:
+            services.schedule_order(order.pk)
+
+        (signatures,), _ = group.call_args
+        assert {signature.task for signature in signatures} == {"food.services.order_in_restaurant"}
+        assert sorted(signature.args[1] for signature in signatures) == sorted([self.rest1.pk, self.rest2.pk])
+        assert {signature.options["queue"] for signature in signatures} == {"high_priority"}
+        group.return_value.apply_async.assert_called_once_with()
+        assert set(TrackingStore().get(order.pk).restaurants) == {str(self.rest1.pk), str(self.rest2.pk)}
+
+    def test_schedule_order_finds_dish_created_by_another_process(self):
+        get_reference_data()
+        (dish,) = Dish.objects.bulk_create([Dish(restaurant=self.rest1, name="Dish 5", price=90)])
+        bump_version()
+        order = Order.objects.create(user=self.john, eta=order_day_calculate())
+        OrderItem.objects.create(order=order, dish=dish, quantity=1)
+
+        with mock.patch.object(services, "group") as group:
+            services.schedule_order(order.pk)
+
+        group.return_value.apply_async.assert_called_once_with()
+        assert Order.objects.get(pk=order.pk).status == OrderStatus.NOT_STARTED
+
+    def test_schedule_orders_isolates_every_order(self):
+        orders = [Order.objects.create(user=self.john, eta=order_day_calculate()) for _ in range(2)]
+        for order in orders:
+            OrderItem.objects.create(order=order, dish=self.dish1, quantity=1)
+
+        with (
+            mock.patch.object(services, "group") as group,
+            mock.patch.object(TrackingStore, "create", side_effect=[RedisError("Connection reset"), None]),
+        ):
+            services.schedule_orders([order.pk for order in orders])
+
+        group.return_value.apply_async.assert_called_once_with()
+        assert [Order.objects.get(pk=order.pk).status for order in orders] == [
+            OrderStatus.FAILED,
+            OrderStatus.NOT_STARTED,
+        ]
+
     def test_create_order_not_authorized(self):
         request_body = {
             "eta": order_day_calculate(),
@@ -106,3 +255,16 @@ class OrderTestCase(TestCase):
 
         response = self.anonymous.post(reverse("food-orders"), data=request_body, format="json")
         assert response.status_code == status.HTTP_401_UNAUTHORIZED, response.json()
+
+    def test_schedule_order_fails_without_provider(self):
+        order = Order.objects.create(user=self.john, eta=order_day_calculate())
+        OrderItem.objects.create(order=order, dish=self.dish1, quantity=1)
+        # Renamed after the order was validated
+        Restaurant.objects.filter(pk=self.rest1.pk).update(name="Silpo Market")
+        reset_providers()
+
+        with mock.patch.object(services, "group") as group:
+            services.schedule_order(order.pk)
+
+        group.assert_not_called()
+        assert Order.objects.get(pk=order.pk).status == OrderStatus.FAILED
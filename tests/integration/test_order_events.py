@@ -0,0 +1,111 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from food.enums import OrderStatus
+from food.models import Order
+from food.tracking import TrackingStore
+from shared.cache import CacheService
+
+from .factories import create_orders, create_user, track_order
+
+
+def parse_event(chunk: str | bytes) -> dict:
+    chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+    lines = dict(line.split(": ", 1) for line in chunk.strip().splitlines())
+
+    return lines | {"data": json.loads(lines["data"])}
+
+
+@override_settings(ORDER_EVENTS_HEARTBEAT=0.1, CACHE_STREAM_READ_BLOCK=0.1)
+class OrderEventsTestCase(TestCase):
+    def setUp(self) -> None:
+        self.john = create_user()
+        self.john.is_active = True
+        self.john.save()
+        (self.order,) = create_orders(self.john)
+        self.url = f"/food/orders/{self.order.pk}/events/"
+        self.access_token = str(AccessToken.for_user(self.john))
+        response = self.client.post(
+            reverse("food-order-events-token", kwargs={"order_id": self.order.pk}),
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+        self.token = response.json()["token"]
+
+        self.tracking = track_order(self.order.pk, [1])
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(self.url)
+
+        assert response.status_code == 401
+
+    async def test_access_token_is_not_accepted_in_url(self):
+        response = await self.async_client.get(self.url, {"token": self.access_token})
+
+        assert response.status_code == 401
+
+    async def test_stream_token_is_scoped_to_the_order(self):
+        (other,) = await sync_to_async(create_orders)(self.john)
+        response = await self.async_client.get(f"/food/orders/{other.pk}/events/", {"token": self.token})
+
+        assert response.status_code == 401
+
+    def test_stream_token_of_another_user_order_is_not_issued(self):
+        (other,) = create_orders(create_user(email="jane@email.com", phone_number="+3809622"))
+        response = self.client.post(
+            reverse("food-order-events-token", kwargs={"order_id": other.pk}),
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+
+        assert response.status_code == 404
+
+    async def test_stream_ends_when_order_fails(self):
+        response = await self.async_client.get(self.url, {"token": self.token})
+        events = aiter(response.streaming_content)
+        assert parse_event(await anext(events))["event"] == "snapshot"
+
+        await Order.objects.filter(pk=self.order.pk).aupdate(status=OrderStatus.FAILED)
+
+        # Heartbeats stop and the stream ends without a tracking event
+        assert [chunk async for chunk in events if chunk != b": heartbeat\n\n"] == []
+
+    async def test_streams_snapshot_then_changes(self):
+        response = await self.async_client.get(self.url, {"token": self.token})
+        events = aiter(response.streaming_content)
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == "text/event-stream"
+
+        snapshot = parse_event(await anext(events))
+        assert snapshot["event"] == "snapshot"
+        assert snapshot["data"]["restaurants"]["1"]["status"] == OrderStatus.NOT_STARTED
+
+        assert await anext(events) == b": heartbeat\n\n"
+
+        self.tracking.update_restaurant(self.order.pk, 1, status=OrderStatus.COOKING)
+        self.tracking.update_delivery(self.order.pk, status=OrderStatus.DELIVERED)
+
+        cooking = parse_event(await anext(events))
+        assert cooking["data"] == {"restaurants.1.status": OrderStatus.COOKING}
+
+        delivered = parse_event(await anext(events))
+        assert delivered["data"] == {"delivery.status": OrderStatus.DELIVERED}
+
+        # The stream ends once the order is delivered
+        assert [chunk async for chunk in events] == []
+
+    async def test_resumes_from_last_event_id(self):
+        self.tracking.update_restaurant(self.order.pk, 1, status=OrderStatus.COOKING)
+        self.tracking.update_restaurant(self.order.pk, 1, status=OrderStatus.COOKED)
+        (created_id, _), (cooking_id, _), _ = CacheService().read_events(
+            TrackingStore.EVENTS_NAMESPACE, str(self.order.pk), "0"
+        )
+
+        response = await self.async_client.get(self.url, {"token": self.token}, headers={"Last-Event-ID": cooking_id})
+        event = parse_event(await anext(aiter(response.streaming_content)))
+
+        assert event["event"] == "tracking"
+        assert event["data"] == {"restaurants.1.status": OrderStatus.COOKED}
@@ -0,0 +1,189 @@
+import asyncio
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase, override_settings
+
+from food.providers import http, kfc, resilience, silpo, uklon
+from shared import process
+from shared.cache import CacheService
+from shared.metrics import NullMetrics, get_metrics, reset_metrics
+
+
+class HttpClientTestCase(SimpleTestCase):
+    def tearDown(self) -> None:
+        http.close_http_clients()
+
+    def test_client_is_reused_per_provider(self):
+        client = http.get_http_client("kfc")
+
+        assert http.get_http_client("kfc") is client
+        assert http.get_http_client("silpo") is not client
+
+    def test_client_is_configured_from_settings(self):
+        with self.settings(PROVIDER_HTTP_CONNECT_TIMEOUT=1.5, PROVIDER_HTTP_READ_TIMEOUT=3):
+            client = http.get_http_client("uklon")
+
+        assert client.timeout.connect == 1.5
+        assert client.timeout.read == 3
+
+    def test_forked_child_gets_new_client(self):
+        client = http.get_http_client("kfc")
+
+        process._forget_after_fork()
+
+        assert http.get_http_client("kfc") is not client
+
+
+def mock_transport(request: httpx.Request) -> httpx.Response:
+    if request.method == "POST":
+        return httpx.Response(201, json={"id": "kfc-1", "status": "not started"})
+
+    return httpx.Response(200, json={"id": request.url.path.rsplit("/", 1)[-1], "status": "cooking"})
+
+
+@mock.patch.object(http, "_client_options", lambda: {"transport": httpx.MockTransport(mock_transport)})
+class ProviderClientTestCase(SimpleTestCase):
+    def tearDown(self) -> None:
+        http.close_http_clients()
+
+    def test_sync_calls(self):
+        order = kfc.Client.create_order(kfc.OrderRequestBody(order=[kfc.OrderItem(dish="Burger", quantity=1)]))
+
+        assert order == kfc.OrderResponse(id="kfc-1", status=kfc.OrderStatus.NOT_STARTED)
+        assert kfc.Client.get_order("kfc-1").status == kfc.OrderStatus.COOKING
+
+    def test_order_request_is_built_from_items(self):
+        items = [{"dish__name": "Burger", "quantity": 2}]
+
+        assert silpo.Client.order_request(items) == silpo.OrderRequestBody(order=[silpo.OrderItem("Burger", 2)])
+        # Uklon delivers the orders, it is not asked to cook anything
+        assert not hasattr(uklon.Client, "order_request")
+
+    async def test_async_calls(self):
+        orders = await asyncio.gather(*(silpo.Client.aget_order(f"silpo-{index}") for index in range(5)))
+
+        assert [order.id for order in orders] == [f"silpo-{index}" for index in range(5)]
+
+        await http.close_async_http_clients()
+
+
+class FlakyTransport(httpx.MockTransport):
+    """Answers with the given responses (or raises the given errors) in order."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        super().__init__(self.respond)
+
+    def respond(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        return httpx.Response(outcome, json={"id": "kfc-1", "status": "cooking"})
+
+
+@override_settings(PROVIDER_RETRY_BACKOFF=0, PROVIDER_BREAKER_THRESHOLD=2)
+class ResilienceTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        reset_metrics()
+
+    def tearDown(self) -> None:
+        http.close_http_clients()
+        reset_metrics()
+
+    def use(self, transport: FlakyTransport) -> FlakyTransport:
+        patcher = mock.patch.object(http, "_client_options", lambda: {"transport": transport})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        return transport
+
+    def test_get_is_retried_on_server_errors(self):
+        transport = self.use(FlakyTransport(503, 502, 200))
+
+        assert kfc.Client.get_order("kfc-1").status == kfc.OrderStatus.COOKING
+        assert transport.calls == 3
+
+    def test_create_is_retried_only_when_not_sent(self):
+        body = kfc.OrderRequestBody(order=[kfc.OrderItem(dish="Burger", quantity=1)])
+        transport = self.use(FlakyTransport(httpx.ConnectError("refused"), 503))
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            kfc.Client.create_order(body)
+
+        assert transport.calls == 2
+
+    def test_open_breaker_fails_fast_until_probe_succeeds(self):
+        transport = self.use(FlakyTransport(503))
+
+        for _ in range(2):
+            with self.assertRaises(httpx.HTTPStatusError):
+                kfc.Client.get_order("kfc-1")
+
+        calls = transport.calls
+        with self.assertRaises(resilience.ProviderUnavailable):
+            kfc.Client.get_order("kfc-1")
+
+        assert transport.calls == calls
+        assert resilience.breaker_states(["kfc"]) == {"kfc": "open"}
+
+        # Cooldown is over: one probe goes through and closes the breaker
+        CacheService().delete("circuit_breaker", "kfc:open")
+        transport.outcomes = [200]
+
+        assert kfc.Client.get_order("kfc-1").status == kfc.OrderStatus.COOKING
+        assert resilience.breaker_states(["kfc"]) == {"kfc": "closed"}
+
+    def test_rejected_probe_closes_breaker(self):
+        transport = self.use(FlakyTransport(503))
+
+        for _ in range(2):
+            with self.assertRaises(httpx.HTTPStatusError):
+                kfc.Client.get_order("kfc-1")
+
+        CacheService().delete("circuit_breaker", "kfc:open")
+        transport.outcomes = [404]
+
+        # The provider answered, so the next call is not rejected as if the probe were still running
+        with self.assertRaises(httpx.HTTPStatusError):
+            kfc.Client.get_order("kfc-1")
+
+        assert resilience.breaker_states(["kfc"]) == {"kfc": "closed"}
+
+        transport.outcomes = [200]
+        assert kfc.Client.get_order("kfc-1").status == kfc.OrderStatus.COOKING
+
+    def test_attempts_are_instrumented(self):
+        self.use(FlakyTransport(503, 200))
+        kfc.Client.get_order("kfc-1")
+
+        http.close_http_clients()
+        self.use(FlakyTransport(httpx.ReadTimeout("slow")))
+        with self.assertRaises(httpx.ReadTimeout):
+            kfc.Client.get_order("kfc-2")
+
+        snapshot = get_metrics().snapshot()
+        tags = "operation=get_order,provider=kfc"
+
+        assert snapshot["counters"][f"provider.responses{{{tags},status=503}}"] == 1
+        assert snapshot["counters"][f"provider.responses{{{tags},status=200}}"] == 1
+        assert snapshot["counters"][f"provider.timeouts{{error=ReadTimeout,{tags}}}"] == 3
+        assert snapshot["histograms"][f"provider.request_ms{{{tags}}}"]["count"] == 5
+        assert snapshot["histograms"][f"provider.response_bytes{{{tags}}}"]["max"] > 0
+
+    @override_settings(METRICS_SINK="shared.metrics.NullMetrics")
+    def test_instrumentation_is_skipped_when_metrics_are_disabled(self):
+        self.use(FlakyTransport(200))
+
+        with (
+            mock.patch.object(NullMetrics, "observe") as observe,
+            mock.patch.object(NullMetrics, "increment") as increment,
+        ):
+            kfc.Client.get_order("kfc-1")
+
+        observe.assert_not_called()
+        increment.assert_not_called()
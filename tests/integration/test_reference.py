@@ -0,0 +1,58 @@
+from django.test import TestCase, override_settings
+
+from food.models import Dish, Restaurant
+from food.reference import bump_version, get_dish, get_reference_data
+from shared.cache import CacheService
+
+
+class ReferenceDataTestCase(TestCase):
+    def setUp(self) -> None:
+        self.restaurant = Restaurant.objects.create(name="Silpo", address="123 Main St")
+        self.dish = Dish.objects.create(restaurant=self.restaurant, name="Dish 1", price=100)
+
+    def test_loaded_once_per_process(self):
+        with self.assertNumQueries(2):
+            for _ in range(3):
+                data = get_reference_data()
+
+        assert data.restaurants[self.restaurant.pk].address == "123 Main St"
+        assert data.dishes[self.dish.pk].price == 100
+        assert data.dishes[self.dish.pk].restaurant_id == self.restaurant.pk
+
+    def test_changes_are_visible_to_the_process_at_once(self):
+        get_reference_data()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dish.price = 120
+            self.dish.save()
+
+        assert get_reference_data().dishes[self.dish.pk].price == 120
+        assert CacheService().get("reference", "version") == 1
+
+        self.dish.delete()
+
+        assert self.dish.pk not in get_reference_data().dishes
+
+    def test_version_bumped_by_another_process_is_picked_up(self):
+        get_reference_data()
+        Dish.objects.filter(pk=self.dish.pk).update(price=150)
+        bump_version()
+
+        with self.assertNumQueries(0):
+            assert get_reference_data().dishes[self.dish.pk].price == 100
+
+        with override_settings(REFERENCE_DATA_CHECK_INTERVAL=0), self.assertNumQueries(2):
+            assert get_reference_data().dishes[self.dish.pk].price == 150
+
+    def test_missing_dish_is_looked_up_after_a_version_check(self):
+        get_reference_data()
+        # Created by another process: no signals, only the version bump
+        (dish,) = Dish.objects.bulk_create([Dish(restaurant=self.restaurant, name="Dish 2", price=80)])
+        bump_version()
+
+        with self.assertNumQueries(2):
+            assert get_dish(dish.pk).price == 80
+
+        with self.assertNumQueries(0):
+            assert get_dish(self.dish.pk).price == 100
+            assert get_dish(9999) is None
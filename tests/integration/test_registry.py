@@ -0,0 +1,114 @@
+from unittest import mock
+
+import httpx
+import pytest
+from django.test import TestCase
+
+from food import services
+from food.enums import OrderStatus
+from food.models import Order, Restaurant
+from food.providers import kfc, silpo
+from food.providers.resilience import ProviderUnavailable
+from food.registry import get_provider, get_provider_by_name
+from shared.cache import CacheService
+
+from .factories import create_orders, create_user, status_error, track_order
+
+
+class RegistryTestCase(TestCase):
+    def setUp(self) -> None:
+        self.kfc = Restaurant.objects.create(name="KFC", address="456 Elm St")
+        self.silpo = Restaurant.objects.create(name="Silpo", address="123 Main St")
+
+    def test_providers_are_loaded_once(self):
+        with self.assertNumQueries(2):
+            for _ in range(3):
+                kfc_provider = get_provider(self.kfc.pk)
+                silpo_provider = get_provider(self.silpo.pk)
+
+        assert kfc_provider.client is kfc.Client
+        assert kfc_provider.tracking == "webhook"
+        assert silpo_provider.client is silpo.Client
+        assert silpo_provider.tracking == "poll"
+        assert silpo_provider.internal_status(silpo.OrderStatus.FINISHED) == OrderStatus.FINISHED
+        assert get_provider_by_name("kfc") == kfc_provider
+
+    def test_restaurant_created_after_loading_is_found(self):
+        get_provider(self.kfc.pk)
+        restaurant = Restaurant.objects.create(name="kfc", address="789 Oak St")
+
+        assert get_provider(restaurant.pk).restaurant_id == restaurant.pk
+
+    def test_unsupported_restaurant(self):
+        restaurant = Restaurant.objects.create(name="Bulba", address="1 Side St")
+
+        with pytest.raises(ValueError):
+            get_provider(restaurant.pk)
+
+
+class OrderInRestaurantTestCase(TestCase):
+    def setUp(self) -> None:
+        self.kfc = Restaurant.objects.create(name="KFC", address="456 Elm St")
+        self.silpo = Restaurant.objects.create(name="Silpo", address="123 Main St")
+        (self.order,) = create_orders(create_user())
+        self.tracking = track_order(self.order.pk, [self.kfc.pk, self.silpo.pk])
+        self.items = [{"id": 1, "dish__name": "Dish 1", "quantity": 2}]
+
+    def test_webhook_provider_maps_external_order(self):
+        response = kfc.OrderResponse(id="kfc-1", status=kfc.OrderStatus.COOKING)
+
+        with mock.patch.object(kfc.Client, "create_order", return_value=response) as create_order:
+            services.order_in_restaurant(self.order.pk, self.kfc.pk, self.items)
+
+        create_order.assert_called_once_with(kfc.OrderRequestBody(order=[kfc.OrderItem(dish="Dish 1", quantity=2)]))
+        assert CacheService().get("kfc_orders", "kfc-1") == {"internal_order_id": self.order.pk}
+        assert self.tracking.polling("kfc") == {}
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.COOKING
+
+    def test_polled_provider_is_handed_to_poller(self):
+        response = silpo.OrderResponse(id="silpo-1", status=silpo.OrderStatus.NOT_STARTED)
+
+        with mock.patch.object(silpo.Client, "create_order", return_value=response) as create_order:
+            services.order_in_restaurant(self.order.pk, self.silpo.pk, self.items)
+            # A retried task does not place the order twice
+            services.order_in_restaurant(self.order.pk, self.silpo.pk, self.items)
+
+        assert create_order.call_count == 1
+        assert list(self.tracking.polling("silpo")) == [(self.order.pk, self.silpo.pk)]
+        assert self.tracking.get(self.order.pk).restaurants[str(self.silpo.pk)]["external_id"] == "silpo-1"
+
+
+@mock.patch.object(services.order_in_restaurant, "max_retries", 2)
+class OrderPlacementRetryTestCase(TestCase):
+    def setUp(self) -> None:
+        self.kfc = Restaurant.objects.create(name="KFC", address="456 Elm St")
+        (self.order,) = create_orders(create_user())
+        self.tracking = track_order(self.order.pk, [self.kfc.pk])
+        self.args = (self.order.pk, self.kfc.pk, [{"id": 1, "dish__name": "Dish 1", "quantity": 2}])
+
+    def test_unavailable_provider_is_retried(self):
+        response = kfc.OrderResponse(id="kfc-1", status=kfc.OrderStatus.COOKING)
+        outcomes = [ProviderUnavailable("open"), httpx.ConnectError("refused"), response]
+
+        with mock.patch.object(kfc.Client, "create_order", side_effect=outcomes) as create_order:
+            services.order_in_restaurant.apply(args=self.args)
+
+        assert create_order.call_count == 3
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.COOKING
+
+    def test_order_fails_once_retries_run_out(self):
+        with mock.patch.object(kfc.Client, "create_order", side_effect=ProviderUnavailable("open")) as create_order:
+            services.order_in_restaurant.apply(args=self.args)
+
+        assert create_order.call_count == 3
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.FAILED
+        assert self.tracking.get(self.order.pk).restaurants[str(self.kfc.pk)]["status"] == OrderStatus.FAILED
+
+    def test_order_that_may_have_been_placed_is_not_sent_again(self):
+        for error in (status_error(422), status_error(503), httpx.ReadTimeout("slow")):
+            with mock.patch.object(kfc.Client, "create_order", side_effect=error) as create_order:
+                services.order_in_restaurant.apply(args=self.args)
+
+            assert create_order.call_count == 1
+
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.FAILED
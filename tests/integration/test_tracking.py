@@ -0,0 +1,223 @@
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from food import services
+from food.enums import OrderStatus
+from food.models import Order, Restaurant
+from food.providers import silpo, uklon
+from food.providers.resilience import ProviderUnavailable
+from food.tracking import TrackingOrder, TrackingStore
+from shared.cache import CacheService
+
+from .factories import create_orders, create_user, status_error, track_order
+
+
+class TrackingOrderTestCase(SimpleTestCase):
+    def test_fields_roundtrip(self):
+        tracking_order = TrackingOrder(
+            restaurants={
+                "1": {"external_id": None, "status": OrderStatus.NOT_STARTED},
+                "2": {"external_id": "abc", "status": OrderStatus.COOKING},
+            },
+            delivery={"status": OrderStatus.DELIVERY, "location": [0.1, 0.2]},
+        )
+
+        fields = tracking_order.to_fields()
+
+        assert fields["restaurants.2.status"] == OrderStatus.COOKING
+        assert fields["delivery.location"] == [0.1, 0.2]
+        assert TrackingOrder.from_fields(fields) == tracking_order
+
+
+class TrackingStoreTestCase(SimpleTestCase):
+    def setUp(self) -> None:
+        self.tracking = TrackingStore()
+        self.tracking.create(
+            1,
+            TrackingOrder(
+                restaurants={
+                    "1": {"external_id": None, "status": OrderStatus.NOT_STARTED},
+                    "2": {"external_id": None, "status": OrderStatus.NOT_STARTED},
+                }
+            ),
+        )
+
+    def test_restaurant_updates_do_not_overwrite_each_other(self):
+        self.tracking.update_restaurant(1, 1, external_id="silpo-1", status=OrderStatus.COOKING)
+        self.tracking.update_restaurant(1, 2, external_id="kfc-1", status=OrderStatus.COOKED)
+        self.tracking.update_delivery(1, status=OrderStatus.DELIVERY, location=(0.1, 0.2))
+
+        assert self.tracking.get(1) == TrackingOrder(
+            restaurants={
+                "1": {"external_id": "silpo-1", "status": OrderStatus.COOKING},
+                "2": {"external_id": "kfc-1", "status": OrderStatus.COOKED},
+            },
+            delivery={"status": OrderStatus.DELIVERY, "location": [0.1, 0.2]},
+        )
+
+    def test_only_the_last_cooked_restaurant_completes_the_order(self):
+        assert not self.tracking.mark_cooked(1, 1)
+        assert not self.tracking.mark_cooked(1, 1)
+        assert self.tracking.mark_cooked(1, 2)
+        assert not self.tracking.mark_cooked(1, 2)
+
+    def test_pending_restaurants_outlive_the_cooking_timeout(self):
+        with self.settings(ORDER_COOKING_TIMEOUT=7200):
+            track_order(2, [1, 2], tracking=self.tracking)
+            assert self.tracking.cache.get_ttl("pending_restaurants", "2") > 7200
+
+            # Every cooked restaurant gives the others the whole timeout again
+            self.tracking.cache.connection.expire("pending_restaurants:2", 10)
+            assert not self.tracking.mark_cooked(2, 1)
+            assert self.tracking.cache.get_ttl("pending_restaurants", "2") > 7200
+
+
+class ProviderPollingTestCase(TestCase):
+    def setUp(self) -> None:
+        self.restaurant = Restaurant.objects.create(name="Silpo", address="123 Main St")
+        self.orders = create_orders(create_user(), count=3)
+        self.tracking = TrackingStore()
+
+        for order in self.orders:
+            track_order(
+                order.pk,
+                [self.restaurant.pk],
+                status=OrderStatus.COOKING,
+                external_id=f"silpo-{order.pk}",
+                tracking=self.tracking,
+            )
+            self.tracking.start_polling("silpo", order.pk, self.restaurant.pk, f"silpo-{order.pk}", OrderStatus.COOKING)
+
+    def poll(self, statuses: dict[str, silpo.OrderStatus]):
+        def get_order(external_id: str) -> silpo.OrderResponse:
+            return silpo.OrderResponse(id=external_id, status=statuses[external_id])
+
+        with (
+            mock.patch.object(silpo.Client, "aget_order", side_effect=get_order) as get_order_mock,
+            mock.patch.object(services.order_delivery, "delay") as delivery,
+        ):
+            services.poll_provider_orders()
+
+        return get_order_mock, delivery
+
+    def test_polls_every_order_once_and_applies_changes(self):
+        cooked, cooking, failed = self.orders
+
+        with self.settings(ORDER_COOKING_TIMEOUT=60):
+            self.tracking.update_polling(
+                "silpo",
+                {
+                    (failed.pk, self.restaurant.pk): {
+                        "external_id": f"silpo-{failed.pk}",
+                        "status": "cooking",
+                        "started_at": 0,
+                    }
+                },
+            )
+            get_order, delivery = self.poll(
+                {
+                    f"silpo-{cooked.pk}": silpo.OrderStatus.COOKED,
+                    f"silpo-{cooking.pk}": silpo.OrderStatus.COOKING,
+                    f"silpo-{failed.pk}": silpo.OrderStatus.COOKING,
+                }
+            )
+
+        assert get_order.call_count == 3
+        delivery.assert_called_once_with(cooked.pk)
+        assert list(self.tracking.polling("silpo")) == [(cooking.pk, self.restaurant.pk)]
+        assert self.tracking.get(cooked.pk).restaurants[str(self.restaurant.pk)]["status"] == OrderStatus.COOKED
+        assert self.tracking.get(failed.pk).restaurants[str(self.restaurant.pk)]["status"] == OrderStatus.FAILED
+        assert Order.objects.get(pk=failed.pk).status == OrderStatus.FAILED
+
+    def test_skips_run_while_locked(self):
+        CacheService().add("locks", "poll_provider_orders", {}, ttl=60)
+
+        get_order, _ = self.poll({})
+
+        get_order.assert_not_called()
+
+
+@mock.patch.object(services.track_delivery, "apply_async")
+class OrderDeliveryTestCase(TestCase):
+    def setUp(self) -> None:
+        restaurant = Restaurant.objects.create(name="KFC", address="456 Elm St")
+        (self.order,) = create_orders(create_user(), status=OrderStatus.COOKED)
+        self.tracking = track_order(self.order.pk, [restaurant.pk], status=OrderStatus.COOKED)
+
+    def test_driver_is_requested_and_tracked(self, apply_async):
+        response = uklon.OrderResponse(
+            order_id="uklon-1", status=uklon.OrderStatus.DELIVERY, location=(0.1, 0.2), addresses=[], comments=[]
+        )
+
+        with mock.patch.object(uklon.Client, "create_order", return_value=response) as create_order:
+            services.order_delivery(self.order.pk)
+
+        assert create_order.call_args.args[0].addresses == ["456 Elm St"]
+        assert apply_async.call_args.kwargs["args"][:2] == (self.order.pk, "uklon-1")
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.DELIVERY
+        assert self.tracking.get(self.order.pk).delivery["external_id"] == "uklon-1"
+
+    def test_unavailable_uklon_is_retried(self, apply_async):
+        response = uklon.OrderResponse(
+            order_id="uklon-1", status=uklon.OrderStatus.DELIVERY, location=(0.1, 0.2), addresses=[], comments=[]
+        )
+        outcomes = [ProviderUnavailable("open"), response]
+
+        with mock.patch.object(uklon.Client, "create_order", side_effect=outcomes) as create_order:
+            services.order_delivery.apply(args=(self.order.pk,))
+
+        assert create_order.call_count == 2
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.DELIVERY
+
+    @mock.patch.object(services.order_delivery, "max_retries", 2)
+    def test_order_is_not_delivered_once_retries_run_out(self, apply_async):
+        with mock.patch.object(uklon.Client, "create_order", side_effect=ProviderUnavailable("open")) as create_order:
+            services.order_delivery.apply(args=(self.order.pk,))
+
+        assert create_order.call_count == 3
+        apply_async.assert_not_called()
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.NOT_DELIVERED
+        assert self.tracking.get(self.order.pk).delivery["status"] == OrderStatus.NOT_DELIVERED
+
+    def test_rejected_request_is_not_retried(self, apply_async):
+        with mock.patch.object(uklon.Client, "create_order", side_effect=status_error(422)) as create_order:
+            services.order_delivery.apply(args=(self.order.pk,))
+
+        assert create_order.call_count == 1
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.NOT_DELIVERED
+        assert self.tracking.get(self.order.pk).delivery["status"] == OrderStatus.NOT_DELIVERED
+
+
+@mock.patch.object(services.track_delivery, "apply_async")
+class DeliveryTrackingTestCase(TestCase):
+    def setUp(self) -> None:
+        (self.order,) = create_orders(create_user(), status=OrderStatus.DELIVERY)
+        self.tracking = track_order(self.order.pk, delivery={"status": OrderStatus.DELIVERY})
+
+    def track(self, status: uklon.OrderStatus, location: tuple[float, float], interval: float):
+        response = uklon.OrderResponse(order_id="uklon-1", status=status, location=location, addresses=[], comments=[])
+
+        with mock.patch.object(uklon.Client, "get_order", return_value=response):
+            services.track_delivery(self.order.pk, "uklon-1", [0.1, 0.2], time.time(), interval)
+
+    def test_backs_off_while_courier_stands_still(self, apply_async):
+        with self.settings(DELIVERY_POLL_MIN_INTERVAL=1, DELIVERY_POLL_BACKOFF=2, DELIVERY_POLL_MAX_INTERVAL=5):
+            self.track(uklon.OrderStatus.DELIVERY, (0.1, 0.2), interval=2)
+            assert apply_async.call_args.kwargs["countdown"] == 4
+
+            self.track(uklon.OrderStatus.DELIVERY, (0.1, 0.2), interval=4)
+            assert apply_async.call_args.kwargs["countdown"] == 5
+
+            self.track(uklon.OrderStatus.DELIVERY, (0.3, 0.4), interval=5)
+            assert apply_async.call_args.kwargs["countdown"] == 1
+
+        assert self.tracking.get(self.order.pk).delivery["location"] == [0.3, 0.4]
+
+    def test_delivered_is_saved_to_cache_and_database(self, apply_async):
+        self.track(uklon.OrderStatus.DELIVERED, (0.5, 0.6), interval=1)
+
+        apply_async.assert_not_called()
+        assert self.tracking.get(self.order.pk).delivery["status"] == OrderStatus.DELIVERED
+        assert Order.objects.get(pk=self.order.pk).status == OrderStatus.DELIVERED
@@ -0,0 +1,109 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from food import services
+from food.enums import OrderStatus
+from food.models import Order, Restaurant
+from food.webhooks import WebhookEvent, WebhookStream
+from shared.cache import CacheService
+
+from .factories import create_orders, create_user, track_order
+
+WEBHOOK_URL = "/webhooks/kfc/5834eb6c-63b9-4018-b6d3-04e170278ec2/"
+
+
+class WebhookTestCase(TestCase):
+    def setUp(self) -> None:
+        self.restaurant = Restaurant.objects.create(name="KFC", address="456 Elm St")
+        self.orders = create_orders(create_user(), count=2)
+
+        for order in self.orders:
+            self.tracking = track_order(order.pk, [self.restaurant.pk])
+            CacheService().set("kfc_orders", f"kfc-{order.pk}", {"internal_order_id": order.pk})
+
+    def post(self, payload: dict | str):
+        return self.client.post(WEBHOOK_URL, data=payload, content_type="application/json")
+
+    def drain(self):
+        with mock.patch.object(services.order_delivery, "delay") as delivery:
+            services.drain_webhook_events()
+
+        return delivery
+
+    def test_webhook_is_queued_without_being_applied(self):
+        response = self.post({"id": "kfc-1", "status": "cooking"})
+
+        assert response.status_code == 200, response.json()
+        assert WebhookStream().read(10)[0][1] == WebhookEvent(provider="kfc", external_id="kfc-1", status="cooking")
+        assert all(order.status == OrderStatus.NOT_STARTED for order in Order.objects.all())
+
+    def test_invalid_webhooks_are_rejected(self):
+        assert self.post("{").status_code == 400
+        assert self.post({"status": "cooking"}).status_code == 400
+        assert self.post({"id": "kfc-1", "status": "eaten"}).status_code == 400
+        assert WebhookStream().read(10) == []
+
+    def test_events_are_deduplicated_and_applied_in_batches(self):
+        cooking, cooked = self.orders
+
+        for payload in (
+            {"id": f"kfc-{cooking.pk}", "status": "cooking"},
+            {"id": f"kfc-{cooking.pk}", "status": "cooking"},
+            {"id": f"kfc-{cooked.pk}", "status": "cooking"},
+            {"id": f"kfc-{cooked.pk}", "status": "cooked"},
+            {"id": f"kfc-{cooked.pk}", "status": "cooked"},
+            {"id": "kfc-unknown", "status": "cooked"},
+        ):
+            self.post(payload)
+
+        with self.settings(WEBHOOK_BATCH_SIZE=2):
+            delivery = self.drain()
+
+        delivery.assert_called_once_with(cooked.pk)
+        assert Order.objects.get(pk=cooking.pk).status == OrderStatus.COOKING
+        assert Order.objects.get(pk=cooked.pk).status == OrderStatus.COOKED
+        restaurant = self.tracking.get(cooked.pk).restaurants[str(self.restaurant.pk)]
+        assert restaurant == {"external_id": f"kfc-{cooked.pk}", "status": OrderStatus.COOKED}
+
+        # Applied events are not read again
+        assert WebhookStream().read(10) == []
+        self.drain().assert_not_called()
+
+    def test_late_event_does_not_undo_a_cooked_one(self):
+        order = self.orders[0]
+        external_id = f"kfc-{order.pk}"
+
+        with mock.patch.object(services.order_delivery, "delay") as delivery:
+            services.apply_webhook_events(
+                [
+                    WebhookEvent(provider="kfc", external_id=external_id, status="cooked"),
+                    WebhookEvent(provider="kfc", external_id=external_id, status="cooking"),
+                ],
+                self.tracking,
+            )
+
+        delivery.assert_called_once_with(order.pk)
+        assert self.tracking.get(order.pk).restaurants[str(self.restaurant.pk)]["status"] == OrderStatus.COOKED
+
+    def test_events_of_unknown_providers_are_skipped(self):
+        order = self.orders[0]
+        CacheService().set("bolt_orders", "bolt-1", {"internal_order_id": order.pk})
+
+        services.apply_webhook_events(
+            [
+                WebhookEvent(provider="bolt", external_id="bolt-1", status="cooking"),
+                WebhookEvent(provider="kfc", external_id=f"kfc-{order.pk}", status="cooking"),
+            ],
+            self.tracking,
+        )
+
+        assert Order.objects.get(pk=order.pk).status == OrderStatus.COOKING
+
+    def test_skips_run_while_locked(self):
+        self.post({"id": f"kfc-{self.orders[0].pk}", "status": "cooking"})
+        CacheService().add("locks", "drain_webhook_events", {}, ttl=60)
+
+        self.drain()
+
+        assert len(WebhookStream().read(10)) == 1